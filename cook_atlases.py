@@ -0,0 +1,38 @@
+import sys, os, argparse, time
+import pygame as pg
+from data.atlas import cook_atlas, ATLAS_GROUPS, ATLAS_PATH
+
+'''
+    packs each asset group into one atlas sheet plus a json rect index, loaders pick them up automatically
+        python cook_atlases.py              cook every group
+        python cook_atlases.py tiles ui     cook some groups
+        python cook_atlases.py --clean      remove the cooked atlases
+'''
+
+def main(args):
+    parser = argparse.ArgumentParser(description='cook asset groups into texture atlases')
+    parser.add_argument('groups', nargs='*', help=f'groups to cook: {", ".join(ATLAS_GROUPS)}')
+    parser.add_argument('--clean', action='store_true', help='remove the cooked atlases instead')
+    args = parser.parse_args(args)
+
+    groups = args.groups or list(ATLAS_GROUPS)
+    for name in groups:
+        if name not in ATLAS_GROUPS:
+            parser.error(f'unknown group {name}')
+        if args.clean:
+            for ext in ('png', 'json'):
+                out = f'{ATLAS_PATH}{name}.{ext}'
+                if os.path.exists(out):
+                    os.remove(out)
+                    print(f'removed {out}')
+            continue
+        start = time.perf_counter()
+        res = cook_atlas(name, ATLAS_GROUPS[name])
+        if res is None:
+            print(f'{name}: no images')
+            continue
+        count, size = res
+        print(f'{name}: {count} images -> {ATLAS_PATH}{name}.png {size[0]}x{size[1]}  {(time.perf_counter() - start) * 1000:.1f}ms')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,35 @@
+import sys, os, argparse, time
+from data.map_format import cook_map, cooked_path
+
+MAP_PATH = 'data/maps/'
+
+'''
+    converts json maps into the cooked binary format read by Tile_Map.load_map
+        python cook_maps.py                 cook every map in data/maps
+        python cook_maps.py data/maps/3.json
+        python cook_maps.py --clean         remove cooked maps
+'''
+
+def main(args):
+    parser = argparse.ArgumentParser(description='cook json maps into .emap files')
+    parser.add_argument('maps', nargs='*', help='json maps to cook, defaults to every map in data/maps')
+    parser.add_argument('--clean', action='store_true', help='remove the cooked maps instead')
+    args = parser.parse_args(args)
+
+    maps = args.maps
+    if not maps:
+        maps = [MAP_PATH + f for f in sorted(os.listdir(MAP_PATH)) if f.endswith('.json')]
+
+    for path in maps:
+        if args.clean:
+            out = cooked_path(path)
+            if os.path.exists(out):
+                os.remove(out)
+                print(f'removed {out}')
+            continue
+        start = time.perf_counter()
+        out = cook_map(path)
+        print(f'{path} -> {out}  {os.path.getsize(path)} -> {os.path.getsize(out)} bytes  {(time.perf_counter() - start) * 1000:.1f}ms')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
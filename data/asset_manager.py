@@ -1,10 +1,12 @@
 import pygame as pg
 import os
 import json
-from .utils import read_f, get_image
+from collections import OrderedDict
+from .utils import read_f, get_cached_image, image_cache, silhouette, outline
 from .settings import CELL_SIZE
 
 ANIM_PATH = 'data/assets/images/animations'
+SCALED_CACHE_SIZE = 512
 
 '''
 animation_data:
@@ -14,30 +16,54 @@ animation_data:
     'config': {"frames": [5], "loop": true, "speed": 1.0, "centered": false, "paused": false}    
 '''
 
+def animation_image_jobs(path=ANIM_PATH):
+    # every animation frame as (path, scale), for image_cache.prefetch
+    jobs = []
+    for folder, dirs, files in os.walk(path):
+        for f in files:
+            if f.split('.')[-1] == 'png':
+                jobs.append((f'{folder}/{f}', [CELL_SIZE, CELL_SIZE]))
+    return jobs
+
+class Lazy_Animations(dict):
+    # state -> Animation, a state's frames and config are read the first time it is looked up
+    def __init__(self, anim_data) -> None:
+        super().__init__()
+        self.anim_data = anim_data
+
+    def __missing__(self, state):
+        anim = self[state] = self.anim_data.load_state(state)
+        return anim
+
 class Animation_Data:
     def __init__(self, path, type) -> None:
+        self.path = path
         self.type = type
+        self.states = os.listdir(path)
         self.animations_data = {}
-        self.animations = {}
-        for anim in os.listdir(path):
-            self.animations_data[anim] = {'images': [], 'config': None}
-            full_path = f'{path}/{anim}/'
-            for img in os.listdir(path + '/' + anim):
-                if img.split('.')[-1] == 'png':
-                    self.animations_data[anim]['images'].append(
-                        get_image(full_path+img, [CELL_SIZE, CELL_SIZE]))
-                else:
-                    f = open(full_path + img, 'r')
-                    config = json.loads(f.read())
-                    f.close()
-                    self.animations_data[anim]['config'] = config
-        self.create_animations()
+        self.animations = Lazy_Animations(self)
+
+    def load_state(self, anim):
+        if anim not in self.states:
+            raise KeyError(f'{self.type} has no {anim} animation')
+        self.animations_data[anim] = {'images': [], 'config': None}
+        full_path = f'{self.path}/{anim}/'
+        for img in os.listdir(self.path + '/' + anim):
+            if img.split('.')[-1] == 'png':
+                self.animations_data[anim]['images'].append(
+                    get_cached_image(full_path+img, [CELL_SIZE, CELL_SIZE]))
+            else:
+                f = open(full_path + img, 'r')
+                config = json.loads(f.read())
+                f.close()
+                self.animations_data[anim]['config'] = config
+        data = self.animations_data[anim]
+        return Animation(anim, data['images'], data['config'])
 
     def create_animations(self):
-        for type, data in self.animations_data.items():
-            images = data['images']
-            config = data['config']
-            self.animations[type] = Animation(type, images, config)
+        # loads every state now instead of on first use
+        for state in self.states:
+            self.animations[state]
 
     def print_data(self):
         for k, j in self.animations.items():
@@ -50,11 +76,105 @@ class Animation_Data:
             for img in images:
                 print('\t\t', img)
 
+class Sprite_Frame:
+    '''
+        one animation frame and the variants drawn from it, every list is indexed by flip:
+        0 as loaded, 1 mirrored horizontally
+            images, masks, silhouettes (white), outlined (image on its outline, 1px bigger on every side),
+            borders (just the outline, sized like outlined)
+        variants are made on first use, build() makes them all up front
+    '''
+    def __init__(self, image, outline_color=None) -> None:
+        self.outline_color = outline_color
+        self.images = [image, None]
+        self.masks = [None, None]
+        self.silhouettes = [None, None]
+        self.outlined = [None, None]
+        self.borders = [None, None]
+
+    def build(self):
+        for flip in (0, 1):
+            self.mask(flip)
+            self.silhouette(flip)
+            if self.outline_color:
+                self.outline(flip)
+                self.border(flip)
+        return self
+
+    def image(self, flip=0):
+        if self.images[flip] is None:
+            self.images[flip] = pg.transform.flip(self.images[0], True, False)
+        return self.images[flip]
+
+    def mask(self, flip=0):
+        if self.masks[flip] is None:
+            self.masks[flip] = pg.mask.from_surface(self.image(flip))
+        return self.masks[flip]
+
+    def silhouette(self, flip=0):
+        if self.silhouettes[flip] is None:
+            self.silhouettes[flip] = silhouette(self.image(flip))
+        return self.silhouettes[flip]
+
+    def outline(self, flip=0):
+        # blit at pos - (1, 1)
+        if self.outlined[flip] is None:
+            surf = self.border(flip).copy()
+            surf.blit(self.image(flip), (1, 1))
+            self.outlined[flip] = surf
+        return self.outlined[flip]
+
+    def border(self, flip=0):
+        # blit at pos - (1, 1)
+        if self.borders[flip] is None:
+            img = self.image(flip)
+            surf = pg.Surface((img.get_width() + 2, img.get_height() + 2), pg.SRCALPHA)
+            outline(surf, img, (1, 1), self.outline_color)
+            self.borders[flip] = surf
+        return self.borders[flip]
+
+class Scaled_Frame_Cache:
+    '''
+        squash and stretch frames, shared by every entity
+        key: (Sprite_Frame, (w, h)), the scale is quantised to the pixel size it produces
+        so any two scales that would draw the same frame share one entry
+        values are Sprite_Frames, their flips, masks and outlines are kept along with them
+        least recently used frames are dropped past max_size
+    '''
+    def __init__(self, max_size) -> None:
+        self.max_size = max_size
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sprite, size):
+        key = (sprite, (int(size[0]), int(size[1])))
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            self.frames.move_to_end(key)
+            return frame
+        self.misses += 1
+        frame = Sprite_Frame(pg.transform.scale(sprite.image(), key[1]), sprite.outline_color)
+        self.frames[key] = frame
+        if len(self.frames) > self.max_size:
+            self.frames.popitem(last=False)
+        return frame
+
+    def stats(self) -> dict:
+        return {'frames': len(self.frames), 'hits': self.hits, 'misses': self.misses}
+
+scaled_frames = Scaled_Frame_Cache(SCALED_CACHE_SIZE)
+
 class Animation:
-    def __init__(self, state, images, config) -> None:
+    def __init__(self, state, images, config, frames=None) -> None:
         self.state = state
         self.images = images.copy()
         self.config = config
+        if frames is None:
+            outline_color = config.get('outline') if config else None
+            frames = [Sprite_Frame(img, outline_color).build() for img in self.images]
+        self.frames = frames
         self.time = 0
         self.frame = 0
 
@@ -71,20 +191,45 @@ class Animation:
     def image(self):
         return self.images[self.frame]
 
+    def sprite(self):
+        return self.frames[self.frame]
+
     def copy(self):
-        return Animation(self.state, self.images, self.config)
+        return Animation(self.state, self.images, self.config, self.frames)
 
 class Asset_Manager:
+    '''
+        animation types are only indexed here, get_anim_data builds a type on first use
+        and each state decodes its frames the first time an entity switches to it
+        prefetch(types) decodes known-hot types up front on the image_cache pool
+    '''
     def __init__(self) -> None:
         self.animations = {}
+        self.anim_paths = {}
         self.get_animations()
+
     def get_animations(self):
         for anim_type in os.listdir(ANIM_PATH):
             anims = os.listdir(ANIM_PATH + '/' + anim_type)
             if anims:
-                self.animations[anim_type] = Animation_Data(ANIM_PATH + '/' + anim_type, anim_type)
+                self.anim_paths[anim_type] = ANIM_PATH + '/' + anim_type
 
     def get_anim_data(self, type):
         if type in self.animations:
             return self.animations[type]
+        if type in self.anim_paths:
+            self.animations[type] = Animation_Data(self.anim_paths[type], type)
+            return self.animations[type]
         assert 0, 'type not found, invalid type'
+
+    def image_jobs(self, types):
+        jobs = []
+        for type in types:
+            jobs += animation_image_jobs(self.anim_paths[type])
+        return jobs
+
+    def prefetch(self, types, jobs=(), raw=()):
+        # decodes the animations of types along with any other image_cache jobs in one batch, then builds them
+        image_cache.prefetch(self.image_jobs(types) + list(jobs), raw=raw)
+        for type in types:
+            self.get_anim_data(type).create_animations()
@@ -0,0 +1,114 @@
+import pygame as pg
+import os, json, threading
+
+'''
+    texture atlases, cooked by cook_atlases.py
+        data/assets/atlases/<group>.png     every image of the group packed into one sheet
+        data/assets/atlases/<group>.json    {'images': {source path: [x, y, w, h, mtime]}}
+    atlas_image(path) hands out a subsurface of the group's sheet instead of opening path,
+    entries whose source file changed after cooking are ignored and load from disk
+'''
+
+ATLAS_PATH = 'data/assets/atlases/'
+ATLAS_GROUPS = {
+    'tiles': 'data/assets/tiles',
+    'anim': 'data/assets/images/anim',
+    'animations': 'data/assets/images/animations',
+    'particles': 'data/assets/images/particles',
+    'projectiles': 'data/assets/images/projectiles',
+    'ui': 'data/assets/images/ui',
+}
+ATLAS_WIDTH = 512
+PADDING = 1
+
+def norm_path(path):
+    return os.path.normpath(path).replace('\\', '/')
+
+def group_images(root):
+    paths = []
+    for folder, dirs, files in os.walk(root):
+        for f in files:
+            if f.split('.')[-1] == 'png':
+                paths.append(norm_path(os.path.join(folder, f)))
+    paths.sort()
+    return paths
+
+def pack(sizes, width=ATLAS_WIDTH):
+    # shelf packing, tallest first. returns {key: (x, y)} and the sheet height
+    placed = {}
+    x = y = shelf = 0
+    for key, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0])):
+        if x + w > width:
+            x = 0
+            y += shelf + PADDING
+            shelf = 0
+        placed[key] = (x, y)
+        x += w + PADDING
+        shelf = max(shelf, h)
+    return placed, y + shelf
+
+def cook_atlas(name, root, out_path=ATLAS_PATH):
+    paths = group_images(root)
+    if not paths:
+        return None
+    images = {p: pg.image.load(p) for p in paths}
+    width = max(ATLAS_WIDTH, max(img.get_width() for img in images.values()))
+    placed, height = pack({p: img.get_size() for p, img in images.items()}, width)
+
+    sheet = pg.Surface((width, max(1, height)), pg.SRCALPHA)
+    index = {}
+    for p, img in images.items():
+        sheet.blit(img, placed[p])
+        index[p] = [placed[p][0], placed[p][1], img.get_width(), img.get_height(), os.path.getmtime(p)]
+
+    os.makedirs(out_path, exist_ok=True)
+    pg.image.save(sheet, f'{out_path}{name}.png')
+    fl = open(f'{out_path}{name}.json', 'w')
+    json.dump({'image': f'{name}.png', 'images': index}, fl)
+    fl.close()
+    return len(index), (width, height)
+
+class Atlas_Index:
+    def __init__(self, path=ATLAS_PATH) -> None:
+        self.path = path
+        self.entries = None         # source path -> (sheet file, rect, mtime), read on first use
+        self.sheets = {}
+        self.lock = threading.Lock()
+
+    def read_index(self):
+        entries = {}
+        if os.path.isdir(self.path):
+            for f in os.listdir(self.path):
+                if f.split('.')[-1] != 'json':
+                    continue
+                fl = open(self.path + f, 'r')
+                data = json.load(fl)
+                fl.close()
+                sheet = self.path + data['image']
+                for p, r in data['images'].items():
+                    entries[p] = (sheet, pg.Rect(r[0], r[1], r[2], r[3]), r[4])
+        return entries
+
+    def get(self, path):
+        with self.lock:
+            if self.entries is None:
+                self.entries = self.read_index()
+            entry = self.entries.get(norm_path(path))
+            if entry is None:
+                return None
+            sheet_path, rect, mtime = entry
+            try:
+                if os.path.getmtime(path) > mtime:
+                    return None
+            except OSError:
+                pass                # source gone, the atlas is all there is
+            sheet = self.sheets.get(sheet_path)
+            if sheet is None:
+                sheet = self.sheets[sheet_path] = pg.image.load(sheet_path)
+        return sheet.subsurface(rect)
+
+atlas_index = Atlas_Index()
+
+def atlas_image(path):
+    # subsurface of the cooked atlas holding path, None when path isn't cooked
+    return atlas_index.get(path)
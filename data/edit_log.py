@@ -0,0 +1,95 @@
+from collections import deque
+
+UNDO_CELLS = 100000             # cell diffs kept for undo, oldest edits are dropped past this
+
+'''
+    undo/redo log of per-cell diffs: (pos, layer, old tile id, new tile id)
+    tiles are interned into a small table, id 0 is an empty cell
+    one group per user action, undoing a group costs O(cells it changed)
+    listeners get every change, including undo/redo, as (pos, layer, old tile, new tile)
+'''
+
+class Edit_Log:
+    def __init__(self, max_cells=UNDO_CELLS) -> None:
+        self.max_cells = max_cells
+        self.tiles = [None]
+        self.tile_ids = {}
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.cells = 0
+        self.group = None
+        self.depth = 0
+        self.replaying = False
+        self.listeners = []
+
+    def tile_id(self, tile):
+        if tile is None:
+            return 0
+        key = tuple(tile)
+        if key not in self.tile_ids:
+            self.tile_ids[key] = len(self.tiles)
+            self.tiles.append(key)
+        return self.tile_ids[key]
+
+    def tile(self, tile_id):
+        if tile_id == 0:
+            return None
+        return list(self.tiles[tile_id])
+
+    # -------- RECORDING -------- #
+    def begin(self):
+        # groups nest, everything until the matching end() is undone as one action
+        self.depth += 1
+        if self.depth == 1:
+            self.group = []
+
+    def end(self):
+        self.depth -= 1
+        if self.depth == 0:
+            group = self.group
+            self.group = None
+            if group:
+                self.push(group)
+
+    def record(self, pos, layer, old, new):
+        for listener in self.listeners:
+            listener(pos, layer, old, new)
+        if self.replaying:
+            return
+        diff = (pos, layer, self.tile_id(old), self.tile_id(new))
+        if self.group is not None:
+            self.group.append(diff)
+        else:
+            self.push([diff])
+
+    def push(self, group):
+        self.redo_stack.clear()
+        self.append(group)
+
+    def append(self, group):
+        self.undo_stack.append(group)
+        self.cells += len(group)
+        while self.cells > self.max_cells and len(self.undo_stack) > 1:
+            self.cells -= len(self.undo_stack.popleft())
+
+    # -------- UNDO / REDO -------- #
+    def undo(self):
+        # edits that revert the last group, [(pos, layer, tile or None)]
+        if not self.undo_stack:
+            return []
+        group = self.undo_stack.pop()
+        self.cells -= len(group)
+        self.redo_stack.append(group)
+        return [(pos, layer, self.tile(old)) for pos, layer, old, new in reversed(group)]
+
+    def redo(self):
+        if not self.redo_stack:
+            return []
+        group = self.redo_stack.pop()
+        self.append(group)
+        return [(pos, layer, self.tile(new)) for pos, layer, old, new in group]
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.cells = 0
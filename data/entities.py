@@ -1,6 +1,7 @@
 import random
 import math
 from .entity import Entity
+from .asset_manager import scaled_frames
 from .utils import *
 from .settings import CELL_SIZE
 false = False
@@ -120,27 +121,29 @@ class Player(Entity):
         if self.anim.config['offset']:
             offset[0] += self.anim.config['offset'][0]
             offset[1] += self.anim.config['offset'][1]
-        img = self.anim.image()
+        sprite = self.anim.sprite()
         if self.scale != [1, 1]:
-            img = pg.transform.scale(img, (int(self.scale[0] * self.image_base_dimensions[0]), int(self.scale[1] * self.image_base_dimensions[1])))
+            sprite = scaled_frames.get(sprite, (self.scale[0] * self.image_base_dimensions[0], self.scale[1] * self.image_base_dimensions[1]))
+            img = sprite.image()
             x_diff = (CELL_SIZE - img.get_width()) // 2
             y_diff = (CELL_SIZE - img.get_height()) // 2
             offset[0] -= x_diff
             offset[1] -= y_diff * 2
-        if self.flip:
-            img = pg.transform.flip(img, self.flip, false)
-        if self.anim.config['outline']:
-            outline(surf, img, ((
-                self.pos[0] - offset[0]), (self.pos[1] - offset[1])), self.anim.config['outline'])
-            
-        self.mask = pg.mask.from_surface(img)
+        flip = int(self.flip)
+        pos = (self.pos[0] - offset[0], self.pos[1] - offset[1])
+
+        self.mask = sprite.mask(flip)
         if self.lives > 0:
-            surf.blit(img, (self.pos[0] - offset[0], self.pos[1] - offset[1]))
+            if self.anim.config['outline']:
+                surf.blit(sprite.outline(flip), (pos[0] - 1, pos[1] - 1))
+            else:
+                surf.blit(sprite.image(flip), pos)
 
             if self.state == 'hurt':
                 if math.sin(self.data.total_time) > 0:
-                    sil = silhouette(img)
-                    surf.blit(sil, (self.pos[0] - offset[0], self.pos[1] - offset[1]))
+                    surf.blit(sprite.silhouette(flip), pos)
+        elif self.anim.config['outline']:
+            surf.blit(sprite.border(flip), (pos[0] - 1, pos[1] - 1))
 
     def squash_effect(self, collisions):
 
@@ -172,17 +175,14 @@ class Player(Entity):
         self.just_hit = true 
         for i in range(5):
             color = random.choice([(190, 5, 55), (200, 30, 30), (180, 10, 10)])
-            particle = ['blood', self.center(), [random.random() * 6 - 3, random.random() * 6 - 3], color, random.randrange(3, 5), random.uniform(.02, .06), 0]
-            self.data.circle_particles.append(particle)
+            self.data.circle_particles.add('blood', self.center(), [random.random() * 6 - 3, random.random() * 6 - 3], color, random.randrange(3, 5), random.uniform(.02, .06), 0)
         for i in range(5):  # right
-            fire = ['fire', self.data.player.pos.copy(), [random.uniform(3, 5) * math.cos(0), random.uniform(-1, 1)],
-                    (10, 0, 0), random.randrange(5, 7), random.uniform(.12, .18), 0]
-            self.data.circle_particles.append(fire)
+            self.data.circle_particles.add('fire', self.data.player.pos, [random.uniform(3, 5) * math.cos(0), random.uniform(-1, 1)],
+                    (10, 0, 0), random.randrange(5, 7), random.uniform(.12, .18), 0)
 
         for i in range(5):  # right
-            fire = ['fire', self.data.player.pos.copy(), [random.uniform(3, 5) * math.cos(math.pi), random.uniform(-1, 1)],
-                     (10, 0, 0), random.randrange(5, 7), random.uniform(.12, .18), 0]
-            self.data.circle_particles.append(fire)
+            self.data.circle_particles.add('fire', self.data.player.pos, [random.uniform(3, 5) * math.cos(math.pi), random.uniform(-1, 1)],
+                     (10, 0, 0), random.randrange(5, 7), random.uniform(.12, .18), 0)
 
         self.force_scalar = 2
 
@@ -190,20 +190,16 @@ class Player(Entity):
         for i in range(18):
             angle = random.uniform(-3.14, 3.14)
             speed = random.randrange(1, 2)
-            particle = ['fire_ball', self.center(), [math.cos(angle) * speed, math.sin(angle) * speed], (245, 237, 186), random.randrange(4, 6), .04, 0]
-            self.data.circle_particles.append(particle)
+            self.data.circle_particles.add('fire_ball', self.center(), [math.cos(angle) * speed, math.sin(angle) * speed], (245, 237, 186), random.randrange(4, 6), .04, 0)
         for i in range(30):
             pos = self.center()
-            fire = ['fire', [pos[0] + random.randrange(-2,2), pos[1] + random.randrange(10,20)], [random.uniform(-.5,.5), random.uniform(-1.2, -.5)], (10, 0, 0), random.randrange(8, 11), random.uniform(.12, .16), 0]
-            self.data.circle_particles.append(fire)
+            self.data.circle_particles.add('fire', [pos[0] + random.randrange(-2,2), pos[1] + random.randrange(10,20)], [random.uniform(-.5,.5), random.uniform(-1.2, -.5)], (10, 0, 0), random.randrange(8, 11), random.uniform(.12, .16), 0)
 
         for i in range(30):
             color = random.choice([(190, 5, 55), (200, 30, 30), (180, 10, 10)])
-            particle = ['blood', self.center(), [random.random() * 6 - 3, random.random() * 6 - 3], color, random.randrange(4, 6), random.uniform(.02, .06), -.2]
-            self.data.circle_particles.append(particle)
+            self.data.circle_particles.add('blood', self.center(), [random.random() * 6 - 3, random.random() * 6 - 3], color, random.randrange(4, 6), random.uniform(.02, .06), -.2)
 
         for i in range(18):
             ang = random.uniform(-math.pi, math.pi)
-            spark = [self.data.player.center(), ang, random.randrange(7, 10), random.randrange(5, 7), random.uniform(.20, .24), 0.9, random.randrange(18, 22), random.uniform(.92, .98), (20, 6, 6)]
-            self.data.sparks.append(spark)
+            self.data.sparks.add(self.data.player.center(), ang, random.randrange(7, 10), random.randrange(5, 7), random.uniform(.20, .24), 0.9, random.randrange(18, 22), random.uniform(.92, .98), (20, 6, 6))
 
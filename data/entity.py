@@ -39,10 +39,11 @@ class Entity:
         if self.anim.config['offset']:
             offset[0] += self.anim.config['offset'][0]
             offset[1] += self.anim.config['offset'][1]
-        img = self.anim.image()
+        sprite = self.anim.sprite()
         if self.anim.config['outline']:
-            outline(surf, self.anim.image(), ((self.pos[0] - offset[0]) // 1, (self.pos[1] - offset[1]) // 1), self.anim.config['outline'])
-        surf.blit(img, (self.pos[0] - offset[0], self.pos[1] - offset[1]))
+            surf.blit(sprite.outline(), ((self.pos[0] - offset[0]) // 1 - 1, (self.pos[1] - offset[1]) // 1 - 1))
+        else:
+            surf.blit(sprite.image(), (self.pos[0] - offset[0], self.pos[1] - offset[1]))
 
     def update(self, dt):
         if self.animated:
@@ -0,0 +1,64 @@
+import pygame as pg
+from .particles import glow_surf, blit_center_add
+from .settings import WIDTH, HEIGHT
+
+LIGHT_SCALE = 2                 # light map is (WIDTH, HEIGHT) / LIGHT_SCALE
+MAX_LIGHTS = 512                # lights past the cap are dropped for the frame
+
+'''
+    every glow of a frame is added into one low resolution light map,
+    which is upscaled and added onto the display
+    clear() -> add() per light -> render(), repeated add() -> render() pairs composite
+    lights into later draw passes, every render() only adds what came since the last one
+'''
+
+class Light_Map:
+    def __init__(self, size=(WIDTH, HEIGHT), scale=LIGHT_SCALE, max_lights=MAX_LIGHTS) -> None:
+        self.size = size
+        self.scale = scale
+        self.max_lights = max_lights
+        self.surf = pg.Surface((size[0] // scale, size[1] // scale)).convert()
+        self.ambient = (0, 0, 0)
+        self.count = 0
+        self.dropped = 0
+        self.pending = False        # anything in surf not yet added onto the display
+
+    def clear(self, ambient=None):
+        if ambient is not None:
+            self.ambient = ambient
+        self.surf.fill(self.ambient)
+        self.pending = any(self.ambient)
+        self.count = 0
+        self.dropped = 0
+
+    def add(self, pos, radius, color):
+        # pos and radius in display pixels
+        if self.count >= self.max_lights:
+            self.dropped += 1
+            return
+        self.count += 1
+        self.pending = True
+        blit_center_add(self.surf, glow_surf(radius / self.scale, color), (pos[0] / self.scale, pos[1] / self.scale))
+
+    def add_many(self, positions, radius, color):
+        # one glow at every row of an (n, 2) array, the same radius and color for all
+        room = self.max_lights - self.count
+        if len(positions) > room:
+            self.dropped += len(positions) - room
+            positions = positions[:room]
+        if not len(positions):
+            return
+        self.count += len(positions)
+        self.pending = True
+        glow = glow_surf(radius / self.scale, color)
+        w = glow.get_width() // 2
+        h = glow.get_height() // 2
+        self.surf.blits([(glow, (x / self.scale - w, y / self.scale - h), None, pg.BLEND_RGBA_ADD) for x, y in positions.tolist()], False)
+
+    def render(self, surf):
+        if not self.pending:
+            return
+        lights = pg.transform.smoothscale(self.surf, surf.get_size())
+        surf.blit(lights, (0, 0), special_flags=pg.BLEND_RGB_ADD)
+        self.surf.fill((0, 0, 0))
+        self.pending = False
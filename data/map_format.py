@@ -0,0 +1,169 @@
+import os, sys, json, struct, mmap
+from array import array
+import numpy as np
+
+'''
+    cooked map format (.emap), little endian
+        header:     magic, version, x0, y0, width, height, n_layers, n_strings, n_tiles, n_entries
+        strings:    n_strings * (u16 length, utf-8 bytes)    tileset types/names, asset paths, layer names
+        layers:     n_layers * u16                           string index of the layer name
+        tiles:      n_tiles * (u16 type, u16 name, i16 id, u16 path)
+        grids:      n_layers * (width * height) u16          0 = empty, n = tiles[n - 1], row major
+        order:      n_entries * (u32 cell, u16 layer)        every placed tile in json order, cell = grid index
+    the order keeps the json's cell and per cell layer order, draw order and camera bounds depend on it
+'''
+
+MAGIC = b'EMAP'
+VERSION = 2
+COOKED_EXT = '.emap'
+
+HEADER = struct.Struct('<4sHiiIIHHHI')
+STR_LEN = struct.Struct('<H')
+LAYER = struct.Struct('<H')
+TILE = struct.Struct('<HHhH')
+ORDER = np.dtype([('cell', '<u4'), ('layer', '<u2')])
+
+def str_to_tuple(str):
+    key = str.split(',')
+    return (int(key[0]), int(key[1]))
+
+def cooked_path(json_path):
+    return os.path.splitext(json_path)[0] + COOKED_EXT
+
+def cook_map(json_path, out_path=None):
+    if out_path is None:
+        out_path = cooked_path(json_path)
+    fl = open(json_path, 'r')
+    map_data = json.load(fl)
+    fl.close()
+
+    cells = {}
+    layer_names = set()
+    for k, layers in map_data['tile_map'].items():
+        cells[str_to_tuple(k)] = layers
+        for layer in layers:
+            layer_names.add(layer)
+    layer_names = sorted(layer_names)
+
+    if cells:
+        x0 = min(pos[0] for pos in cells)
+        y0 = min(pos[1] for pos in cells)
+        w = max(pos[0] for pos in cells) - x0 + 1
+        h = max(pos[1] for pos in cells) - y0 + 1
+    else:
+        x0 = y0 = w = h = 0
+
+    strings = []
+    string_ids = {}
+    def intern(s):
+        if s not in string_ids:
+            string_ids[s] = len(strings)
+            strings.append(s)
+        return string_ids[s]
+
+    tiles = []
+    tile_ids = {}
+    grids = [array('H', bytes(w * h * 2)) for l in layer_names]
+    layer_index = {l: i for i, l in enumerate(layer_names)}
+    for l in layer_names:
+        intern(l)
+    order = []
+    for pos, layers in cells.items():
+        i = (pos[1] - y0) * w + (pos[0] - x0)
+        for layer, tile in layers.items():
+            key = (tile[0], tile[1], int(tile[2]), tile[3])
+            if key not in tile_ids:
+                tiles.append((intern(key[0]), intern(key[1]), key[2], intern(key[3])))
+                tile_ids[key] = len(tiles)
+            grids[layer_index[layer]][i] = tile_ids[key]
+            order.append((i, layer_index[layer]))
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, x0, y0, w, h, len(layer_names), len(strings), len(tiles), len(order)))
+    for s in strings:
+        b = s.encode('utf-8')
+        out += STR_LEN.pack(len(b)) + b
+    for l in layer_names:
+        out += LAYER.pack(string_ids[l])
+    for t in tiles:
+        out += TILE.pack(*t)
+    for grid in grids:
+        if sys.byteorder == 'big':
+            grid.byteswap()
+        out += grid.tobytes()
+    out += np.array(order, dtype=ORDER).tobytes()
+
+    tmp = out_path + '.tmp'
+    fl = open(tmp, 'wb')
+    fl.write(out)
+    fl.close()
+    os.replace(tmp, out_path)
+    return out_path
+
+class Cooked_Map:
+    def __init__(self, path) -> None:
+        fl = open(path, 'rb')
+        try:
+            mm = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            fl.close()
+        try:
+            magic, version, self.x0, self.y0, self.w, self.h, n_layers, n_strings, n_tiles, n_entries = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path}: not a cooked map (version {VERSION})')
+            at = HEADER.size
+
+            strings = []
+            for i in range(n_strings):
+                ln = STR_LEN.unpack_from(mm, at)[0]
+                at += STR_LEN.size
+                strings.append(mm[at:at + ln].decode('utf-8'))
+                at += ln
+
+            self.layers = []
+            for i in range(n_layers):
+                self.layers.append(strings[LAYER.unpack_from(mm, at)[0]])
+                at += LAYER.size
+
+            # tile id n maps to self.tiles[n - 1]: [type, name, id, path]
+            self.tiles = []
+            for i in range(n_tiles):
+                t = TILE.unpack_from(mm, at)
+                self.tiles.append([strings[t[0]], strings[t[1]], t[2], strings[t[3]]])
+                at += TILE.size
+
+            # (n_layers, width * height), copied out of the mapping in one go
+            size = self.w * self.h
+            self.grids = np.frombuffer(mm, dtype='<u2', count=n_layers * size, offset=at).reshape(n_layers, size).copy()
+            at += n_layers * size * 2
+            self.order = np.frombuffer(mm, dtype=ORDER, count=n_entries, offset=at).copy()
+        finally:
+            mm.close()
+
+    def entries(self):
+        # (cell positions, layer indices, tile ids) of every placed tile, in json order, as arrays
+        cell = self.order['cell'].astype(np.int64)
+        layer = self.order['layer'].astype(np.int64)
+        tile_ids = self.grids[layer, cell]
+        xs = self.x0 + cell % self.w
+        ys = self.y0 + cell // self.w
+        return xs, ys, layer, tile_ids
+
+    def cells(self, layer_index):
+        # (pos, tile id) for every non empty cell of a layer, found without walking the empty ones
+        grid = self.grids[layer_index]
+        nonzero = np.flatnonzero(grid)
+        xs = (self.x0 + nonzero % self.w).tolist()
+        ys = (self.y0 + nonzero // self.w).tolist()
+        return zip(zip(xs, ys), grid[nonzero].tolist())
+
+def load_cooked(json_path):
+    # returns the cooked map for json_path when one exists and is not older than the json
+    path = cooked_path(json_path)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(json_path) and os.path.getmtime(path) < os.path.getmtime(json_path):
+        return None
+    try:
+        return Cooked_Map(path)
+    except ValueError:
+        return None                 # other version, recook with cook_maps.py
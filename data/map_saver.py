@@ -0,0 +1,115 @@
+import os, json, queue, threading
+
+'''
+    background writer for editor maps
+        full save:  the whole map, written to a temp file then renamed over the map
+        journal:    append-only <map>.journal, one json line per edit: [pos, layer, tile or null]
+    edits are journaled as they happen and only flushed to disk on save, a full save
+    replaces the map and drops the journal. Tile_Map.read_map replays a journal left behind
+'''
+
+JOURNAL_EXT = '.journal'
+
+def journal_path(path):
+    return path + JOURNAL_EXT
+
+def replay_journal(path, tile_map):
+    # tile_map: json layout, {'x,y': {'layer': tile}}
+    path = journal_path(path)
+    if not os.path.exists(path):
+        return tile_map
+    fl = open(path, 'r')
+    for line in fl:
+        if not line.strip():
+            continue
+        try:
+            pos, layer, tile = json.loads(line)
+        except ValueError:
+            break                   # torn last line from an interrupted write
+        if tile is None:
+            if pos in tile_map:
+                tile_map[pos].pop(layer, None)
+                if not tile_map[pos]:
+                    del tile_map[pos]
+        else:
+            if pos not in tile_map:
+                tile_map[pos] = {}
+            tile_map[pos][layer] = tile
+    fl.close()
+    return tile_map
+
+class Map_Saver:
+    def __init__(self, path) -> None:
+        self.path = path
+        self.journal = journal_path(path)
+        self.jobs = queue.Queue()
+        self.saves = 0
+        self.flushes = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # -------- MAIN THREAD -------- #
+    def log(self, pos, layer, tile):
+        # pos as 'x,y', layer as str, tile None when removed. tile lists must not be mutated afterwards
+        self.jobs.put(('edit', (pos, layer, tile)))
+
+    def flush(self):
+        self.jobs.put(('flush', None))
+
+    def save(self, tile_map, all_layers):
+        # tile_map: {pos: {layer: tile}}, the layer dicts are copied here, tiles are shared
+        snapshot = {pos: layers.copy() for pos, layers in tile_map.items()}
+        self.jobs.put(('full', (snapshot, list(all_layers))))
+
+    def close(self):
+        self.flush()
+        self.jobs.put(('stop', None))
+        self.thread.join()
+
+    # -------- WORKER THREAD -------- #
+    def run(self):
+        edits = []
+        while True:
+            job, data = self.jobs.get()
+            try:
+                if job == 'edit':
+                    edits.append(data)
+                elif job == 'flush':
+                    self.write_journal(edits)
+                    edits = []
+                elif job == 'full':
+                    self.write_full(*data)
+                    edits = []
+                elif job == 'stop':
+                    return
+            except OSError as e:
+                print(f'saving {self.path} failed: {e}')
+
+    def write_journal(self, edits):
+        if not edits:
+            return
+        fl = open(self.journal, 'a')
+        for edit in edits:
+            fl.write(json.dumps(edit) + '\n')
+        fl.flush()
+        os.fsync(fl.fileno())
+        fl.close()
+        self.flushes += 1
+
+    def write_full(self, snapshot, all_layers):
+        tile_map = {}
+        for pos, layers in snapshot.items():
+            tile_map[f'{pos[0]},{pos[1]}'] = {str(layer): tile for layer, tile in layers.items()}
+        tmp = self.path + '.tmp'
+        fl = open(tmp, 'w')
+        json.dump({
+            'all_layers': all_layers,
+            'tile_map': tile_map
+        }, fl)
+        fl.flush()
+        os.fsync(fl.fileno())
+        fl.close()
+        os.replace(tmp, self.path)
+        if os.path.exists(self.journal):
+            os.remove(self.journal)
+        self.saves += 1
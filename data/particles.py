@@ -1,19 +1,97 @@
 import pygame as pg 
 import random, os
+import numpy as np
+from collections import OrderedDict
 from .utils import * 
+from .settings import WIDTH, HEIGHT
 
 global colokey_e
 colorkey_e = (0, 0, 0)
+PARTICLE_SCALE = 1.5
+PARTICLE_CAPACITY = 1024        # starting rows of a Particle_System, doubled when full
+PARTICLE_MARGIN = 16            # particles this far off screen are still drawn
+TINT_CACHE_SIZE = 512
 global particle_images
 particle_images = {}
 global projectile_images 
 projectile_images = {}
+projectile_masks = {}
 
 def circle_surf(size, color):
     surf = pg.Surface((size * 2 + 2, size * 2 + 2))
     pg.draw.circle(surf, color, (size + 1, size + 1), size)
     return surf
 
+GLOW_CACHE_SIZE = 256
+
+class Glow_Cache:
+    '''
+        pre-rendered circle_surf glows, key: (surface side, int rgb)
+        circle_surf draws the same circle for every radius that gives the same int(size * 2 + 2) side,
+        so fractional radii share an entry and still get exactly what circle_surf(size, color) draws
+        least recently used glows are dropped past max_size
+    '''
+    def __init__(self, max_size) -> None:
+        self.max_size = max_size
+        self.surfs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, size, color):
+        key = (int(size * 2 + 2), (int(color[0]), int(color[1]), int(color[2])))
+        surf = self.surfs.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfs.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = circle_surf(size, key[1])
+        self.surfs[key] = surf
+        if len(self.surfs) > self.max_size:
+            self.surfs.popitem(last=False)
+        return surf
+
+    def stats(self) -> dict:
+        return {'glows': len(self.surfs), 'hits': self.hits, 'misses': self.misses}
+
+glow_cache = Glow_Cache(GLOW_CACHE_SIZE)
+
+def glow_surf(size, color):
+    return glow_cache.get(size, color)
+
+class Tint_Cache:
+    '''
+        particle frames with their white swapped for a colour, key: (particle type, frame, int rgb)
+        least recently used tints are dropped past max_size
+    '''
+    def __init__(self, max_size) -> None:
+        self.max_size = max_size
+        self.surfs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, particle_type, frame, color):
+        key = (particle_type, frame, (int(color[0]), int(color[1]), int(color[2])))
+        surf = self.surfs.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfs.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = swap_color(particle_images[particle_type][frame], (255, 255, 255), key[2])
+        self.surfs[key] = surf
+        if len(self.surfs) > self.max_size:
+            self.surfs.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self.surfs.clear()
+
+    def stats(self) -> dict:
+        return {'tints': len(self.surfs), 'hits': self.hits, 'misses': self.misses}
+
+tint_cache = Tint_Cache(TINT_CACHE_SIZE)
+
 def blit_center(target_surf, surf, loc):
     target_surf.blit(surf, (loc[0] - surf.get_width() // 2, loc[1] - surf.get_height() // 2))
 
@@ -32,6 +110,7 @@ def particle_file_sort(l):
 
 def load_particle_images(path):
     global particle_images, colorkey_e
+    tint_cache.clear()
     file_list = os.listdir(path)
     for folder in file_list:
         #try:
@@ -39,18 +118,30 @@ def load_particle_images(path):
         img_list = particle_file_sort(img_list)
         images = []
         for img in img_list:
-            image = pg.image.load(path + '/' + folder + '/' + img).convert()
-            w = image.get_width()
-            h = image.get_height()
-            image = pg.transform.scale(image, (w * 1.5, h * 1.5))
+            image = image_cache.take(path + '/' + folder + '/' + img, PARTICLE_SCALE).convert()
             images.append(image)
         for img in images:
-            img.set_colorkey(colorkey_e)
+            img.set_colorkey(colorkey_e, pg.RLEACCEL)
             
         particle_images[folder] = images.copy()
         #except:
         #    pass
 
+def particle_image_jobs(path):
+    # (path, scale) of every particle frame, decoded raw: load_particle_images converts them itself
+    jobs = []
+    for folder in os.listdir(path):
+        for img in os.listdir(path + '/' + folder):
+            jobs.append((path + '/' + folder + '/' + img, PARTICLE_SCALE))
+    return jobs
+
+def projectile_image_jobs(path, size):
+    jobs = []
+    for proj_path in os.listdir(path):
+        for img in os.listdir(f'{path}/{proj_path}'):
+            jobs.append((f'{path}/{proj_path}/{img}', size))
+    return jobs
+
 def load_projectile_images(path, size):
     global projectile_images
     proj_image_list = os.listdir(path)
@@ -58,56 +149,146 @@ def load_projectile_images(path, size):
         img_list = os.listdir(f'{path}/{proj_path}')
         images = []
         for img in img_list:
-            image = get_image(f'{path}/{proj_path}/{img}', size)
+            image = get_cached_image(f'{path}/{proj_path}/{img}', size)
             images.append(image)
         projectile_images[proj_path] = images.copy()
+        projectile_masks[proj_path] = [pg.mask.from_surface(image) for image in images]
 
-class Particle(object):
-    def __init__(self,x,y,particle_type,motion,decay_rate,start_frame,custom_color=None, physics=False):
-        self.x = x
-        self.y = y
-        self.type = particle_type
-        self.motion = motion.copy()
-        self.color = custom_color
-        self.frame = start_frame
-        self.physics = physics
-        self.orig_motion = self.motion
-        self.temp_motion = [0, 0]
-        self.decay_rate = decay_rate
-        self.time_left = len(particle_images[self.type]) + 1 - self.frame
-        self.render = True
-        self.random_constant = random.randint(20, 30) / 30
+class Particle_System:
+    '''
+        every particle in parallel arrays, one row each, live rows packed at the front in spawn order
+            pos, motion: (n, 2)   frame, decay: (n,)   kind: particle_images key id   color: id, -1 none
+            physics: rows that don't move on their own
+        update() steps every particle at once, the frame is then drawn with draw_list()/light_positions()
+        and compact() drops the particles that ran out of frames, so the last frame of a particle still lights
+    '''
+    def __init__(self, capacity=PARTICLE_CAPACITY) -> None:
+        self.kinds = []
+        self.kind_ids = {}
+        self.lengths = np.zeros(0, dtype=np.int32)    # frames per kind
+        self.first = np.zeros(0, dtype=np.int32)
+        self.images = []
+        self.image_keys = []                            # flat table index -> (kind, frame)
+        self.half_w = np.zeros(0, dtype=np.int32)
+        self.half_h = np.zeros(0, dtype=np.int32)
+        self.colors = []
+        self.color_ids = {}
+        self.count = 0
+        self.peak = 0
+        self.allocate(capacity)
 
-    def draw(self,surface, scroll):
-        global particle_images
-        if self.render:
-            if self.frame > len(particle_images[self.type]):
-                self.frame = len(particle_images[self.type])
-            if self.color == None:
-                blit_center(surface,particle_images[self.type][int(self.frame)],(self.x-scroll[0],self.y-scroll[1]))
-            else:
-                new_surf = swap_color(particle_images[self.type][int(self.frame)], (255,255,255), self.color)
-                blit_center(surface, new_surf, (self.x-scroll[0],self.y-scroll[1]))
+    def allocate(self, capacity):
+        n = self.count
+        old = (self.pos[:n], self.motion[:n], self.frame[:n], self.decay[:n], self.kind[:n], self.color[:n], self.physics[:n]) if n else None
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.motion = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity)
+        self.decay = np.zeros(capacity)
+        self.kind = np.zeros(capacity, dtype=np.int32)
+        self.color = np.full(capacity, -1, dtype=np.int32)
+        self.physics = np.zeros(capacity, dtype=bool)
+        if old is not None:
+            self.pos[:n], self.motion[:n], self.frame[:n], self.decay[:n], self.kind[:n], self.color[:n], self.physics[:n] = old
 
-    def update(self, dt):
-        self.frame += self.decay_rate 
-        self.time_left = len(particle_images[self.type]) + 1 - self.frame
-        running = True
-        self.render = True
-        if self.frame >= len(particle_images[self.type]):
-            self.render = False
-            if self.frame >= len(particle_images[self.type]) + 1:
-                running = False
-            running = False
-        if not self.physics:
-            self.x += (self.temp_motion[0] + self.motion[0]) 
-            self.y += (self.temp_motion[1] + self.motion[1])
-        self.temp_motion = [0, 0]
-        return running
-    
+    def kind_id(self, particle_type):
+        if particle_type not in self.kind_ids:
+            images = particle_images[particle_type]
+            self.kind_ids[particle_type] = len(self.kinds)
+            self.kinds.append(particle_type)
+            self.lengths = np.append(self.lengths, len(images))
+            # every kind's frames in one flat table, a row's image is first[kind] + int(frame)
+            self.first = np.append(self.first, len(self.images))
+            self.images += images
+            self.image_keys += [(particle_type, i) for i in range(len(images))]
+            self.half_w = np.append(self.half_w, [img.get_width() // 2 for img in images])
+            self.half_h = np.append(self.half_h, [img.get_height() // 2 for img in images])
+        return self.kind_ids[particle_type]
+
+    def color_id(self, color):
+        if color is None:
+            return -1
+        color = tuple(color)
+        if color not in self.color_ids:
+            self.color_ids[color] = len(self.colors)
+            self.colors.append(color)
+        return self.color_ids[color]
+
+    def add(self, x, y, particle_type, motion, decay_rate, start_frame, custom_color=None, physics=False):
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        i = self.count
+        self.pos[i] = (x, y)
+        self.motion[i] = motion
+        self.frame[i] = start_frame
+        self.decay[i] = decay_rate
+        self.kind[i] = self.kind_id(particle_type)
+        self.color[i] = self.color_id(custom_color)
+        self.physics[i] = physics
+        self.count += 1
+        self.peak = max(self.peak, self.count)
+
+    def update(self):
+        n = self.count
+        self.frame[:n] += self.decay[:n]
+        moving = ~self.physics[:n]
+        self.pos[:n][moving] += self.motion[:n][moving]
+
+    def compact(self):
+        n = self.count
+        alive = self.frame[:n] < self.lengths[self.kind[:n]]
+        m = int(alive.sum())
+        if m == n:
+            return
+        for arr in (self.pos, self.motion, self.frame, self.decay, self.kind, self.color, self.physics):
+            arr[:m] = arr[:n][alive]
+        self.count = m
+
+    def rows(self, kinds):
+        # indices of the live rows of the given types
+        n = self.count
+        ids = [self.kind_ids[k] for k in kinds if k in self.kind_ids]
+        if not ids:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self.kind[:n], ids))
+
+    def draw_list(self, kinds, offset, size=(WIDTH, HEIGHT)):
+        # (surface, [x, y]) pairs centered on each particle still inside its frames, for surf.blits
+        rows = self.rows(kinds)
+        frames = self.frame[rows]
+        rows = rows[frames < self.lengths[self.kind[rows]]]
+        x = self.pos[rows, 0] - offset[0]
+        y = self.pos[rows, 1] - offset[1]
+        on_screen = (x > -PARTICLE_MARGIN) & (x < size[0] + PARTICLE_MARGIN) & (y > -PARTICLE_MARGIN) & (y < size[1] + PARTICLE_MARGIN)
+        rows = rows[on_screen]
+        image_ids = self.first[self.kind[rows]] + self.frame[rows].astype(np.int32)
+        dests = np.column_stack((x[on_screen] - self.half_w[image_ids], y[on_screen] - self.half_h[image_ids])).tolist()
+        colors = self.color[rows]
+        tinted = colors != -1
+        table = self.images
+        if tinted.any():
+            # one cache lookup per distinct (frame, colour) on screen, tinted surfaces appended to the table
+            pairs = image_ids[tinted].astype(np.int64) * len(self.colors) + colors[tinted]
+            unique, inverse = np.unique(pairs, return_inverse=True)
+            table = table + [tint_cache.get(*self.image_keys[pair // len(self.colors)], self.colors[pair % len(self.colors)])
+                             for pair in unique.tolist()]
+            image_ids[tinted] = len(self.images) + inverse.reshape(-1)
+        images = list(map(table.__getitem__, image_ids.tolist()))
+        return zip(images, dests)
+
+    def light_positions(self, kind, offset):
+        # (n, 2) display positions of every live particle of one type, drawn or not
+        rows = self.rows([kind])
+        return np.column_stack((self.pos[rows, 0] - offset[0], self.pos[rows, 1] - offset[1]))
 
+    def clear(self):
+        self.count = 0
 
+    def __len__(self):
+        return self.count
 
+    def stats(self) -> dict:
+        return {'particles': self.count, 'peak': self.peak, 'capacity': self.capacity}
 
 '''
 class Particle:
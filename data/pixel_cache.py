@@ -0,0 +1,121 @@
+import pygame as pg
+import os, json, struct, threading
+
+'''
+    persistent cache of decoded, already scaled pixels, one file for every image
+        header:     magic, version, index length
+        index:      json {key: [mtime, width, height, offset]}, key = 'path|size'
+        pixels:     width * height * 4 RGBA bytes per entry, offsets from the end of the index
+    size is None (file size), (w, h) or a float factor of the file size.
+    an entry is only used while its source keeps the mtime it was cooked from,
+    new entries are added with put() and written out by save()
+'''
+
+CACHE_PATH = 'data/cache/pixels.cache'
+MAGIC = b'PXC1'
+HEADER = struct.Struct('<4sI')
+
+def cache_key(path, size):
+    return f'{os.path.normpath(path)}|{size}'
+
+def source_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+class Pixel_Cache:
+    def __init__(self, path=CACHE_PATH) -> None:
+        self.path = path
+        self.entries = None         # key -> [mtime, w, h, offset] in self.blob, read on first use
+        self.blob = b''
+        self.added = {}             # key -> [mtime, w, h, bytes] not yet saved
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read(self):
+        self.entries = {}
+        if not os.path.exists(self.path):
+            return
+        fl = open(self.path, 'rb')
+        data = fl.read()
+        fl.close()
+        try:
+            magic, index_len = HEADER.unpack_from(data, 0)
+            if magic != MAGIC:
+                return
+            at = HEADER.size + index_len
+            self.entries = json.loads(data[HEADER.size:at].decode('utf-8'))
+            self.blob = memoryview(data)[at:]
+        except (struct.error, ValueError):
+            self.entries = {}       # unreadable cache, rebuilt on the next save
+
+    def get(self, path, size):
+        # the cached surface (unconverted), None when missing or stale
+        key = cache_key(path, size)
+        mtime = source_mtime(path)
+        with self.lock:
+            if self.entries is None:
+                self.read()
+            entry = self.added.get(key)
+            if entry is not None and entry[0] == mtime:
+                self.hits += 1
+                return pg.image.frombytes(entry[3], (entry[1], entry[2]), 'RGBA')
+            entry = self.entries.get(key)
+            if entry is None or mtime is None or entry[0] != mtime:
+                self.misses += 1
+                return None
+            self.hits += 1
+            start = entry[3]
+            pixels = self.blob[start:start + entry[1] * entry[2] * 4]
+        return pg.image.frombytes(bytes(pixels), (entry[1], entry[2]), 'RGBA')
+
+    def put(self, path, size, img):
+        mtime = source_mtime(path)
+        if mtime is None:
+            return
+        pixels = pg.image.tobytes(img, 'RGBA')
+        with self.lock:
+            self.added[cache_key(path, size)] = [mtime, img.get_width(), img.get_height(), pixels]
+
+    def save(self):
+        # rewrites the cache file when anything was added, entries of changed or removed sources are dropped
+        with self.lock:
+            if not self.added:
+                return
+            if self.entries is None:
+                self.read()
+            index = {}
+            chunks = []
+            offset = 0
+            for key, (mtime, w, h, start) in self.entries.items():
+                if key in self.added or source_mtime(key.split('|')[0]) != mtime:
+                    continue
+                size = w * h * 4
+                chunks.append(self.blob[start:start + size])
+                index[key] = [mtime, w, h, offset]
+                offset += size
+            for key, (mtime, w, h, pixels) in self.added.items():
+                chunks.append(pixels)
+                index[key] = [mtime, w, h, offset]
+                offset += len(pixels)
+            index_bytes = json.dumps(index).encode('utf-8')
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + '.tmp'
+            fl = open(tmp, 'wb')
+            fl.write(HEADER.pack(MAGIC, len(index_bytes)))
+            fl.write(index_bytes)
+            for chunk in chunks:
+                fl.write(chunk)
+            fl.close()
+            os.replace(tmp, self.path)
+            self.entries = None     # re read lazily from the new file
+            self.blob = b''
+            self.added = {}
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'unsaved': len(self.added)}
+
+pixel_cache = Pixel_Cache()
@@ -0,0 +1,170 @@
+'''
+    fixed capacity pools for short lived effects, every record is made once when the pool is
+    and reused after that. live records are packed at the front of items in [0, count),
+    the dead ones behind them are the free list: add() takes the first free record,
+    free() swaps a dead record with the last live one. a full pool drops new records
+        for i in range(pool.count): ... collect dead indices ... pool.free(dead)
+    sparks are simulated all at once, Spark_Pool keeps them as arrays instead of records
+'''
+import math
+import numpy as np
+from .settings import WIDTH, HEIGHT
+
+CIRCLE_PARTICLES = 2048
+SPARKS = 1024
+CIRCLES = 256
+
+class Circle_Particle:
+    __slots__ = ('type', 'x', 'y', 'vx', 'vy', 'color', 'size', 'decay', 'dur')
+
+    def set(self, type, pos, vel, color, size, decay, dur):
+        self.type = type
+        self.x = pos[0]
+        self.y = pos[1]
+        self.vx = vel[0]
+        self.vy = vel[1]
+        self.color = color
+        self.size = size
+        self.decay = decay
+        self.dur = dur
+
+class Circle:
+    __slots__ = ('x', 'y', 'speed', 'radius', 'width', 'decay', 'speed_decay', 'color')
+
+    def set(self, pos, speed, radius, width, decay, speed_decay, color):
+        self.x = pos[0]
+        self.y = pos[1]
+        self.speed = speed
+        self.radius = radius
+        self.width = width
+        self.decay = decay
+        self.speed_decay = speed_decay
+        self.color = color
+
+class Pool:
+    def __init__(self, record, capacity) -> None:
+        self.items = [record() for i in range(capacity)]
+        self.capacity = capacity
+        self.count = 0
+        self.peak = 0
+        self.dropped = 0
+
+    def add(self, *args):
+        # args as the record's set(), returns the record or None when the pool is full
+        if self.count == self.capacity:
+            self.dropped += 1
+            return None
+        item = self.items[self.count]
+        item.set(*args)
+        self.count += 1
+        if self.count > self.peak:
+            self.peak = self.count
+        return item
+
+    def free(self, indices):
+        # indices: ascending live indices, freed from the back so every swap brings in a live record
+        items = self.items
+        for i in reversed(indices):
+            self.count -= 1
+            items[i], items[self.count] = items[self.count], items[i]
+
+    def live(self):
+        return self.items[:self.count]
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def stats(self) -> dict:
+        return {'live': self.count, 'peak': self.peak, 'dropped': self.dropped, 'capacity': self.capacity}
+
+class Spark_Pool:
+    '''
+        sparks as parallel arrays, live ones packed at the front in spawn order
+        the angle is only kept as its cos and sin, taken once at spawn
+        update() moves and decays every spark at once and drops the burnt out ones,
+        polygons() builds every spark's 4 point polygon in one pass
+    '''
+    def __init__(self, capacity) -> None:
+        self.capacity = capacity
+        self.count = 0
+        self.peak = 0
+        self.dropped = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.cos = np.zeros(capacity)
+        self.sin = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.width = np.zeros(capacity)
+        self.decay = np.zeros(capacity)
+        self.speed_decay = np.zeros(capacity)
+        self.length = np.zeros(capacity)
+        self.length_decay = np.zeros(capacity)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.fields = (self.x, self.y, self.cos, self.sin, self.speed, self.width, self.decay,
+                       self.speed_decay, self.length, self.length_decay, self.color)
+
+    def add(self, pos, angle, speed, width, decay, speed_decay, length, length_decay, color):
+        if self.count == self.capacity:
+            self.dropped += 1
+            return
+        i = self.count
+        self.x[i] = pos[0]
+        self.y[i] = pos[1]
+        self.cos[i] = math.cos(angle)
+        self.sin[i] = math.sin(angle)
+        self.speed[i] = speed
+        self.width[i] = width
+        self.decay[i] = decay
+        self.speed_decay[i] = speed_decay
+        self.length[i] = length
+        self.length_decay[i] = length_decay
+        self.color[i] = color
+        self.count += 1
+        if self.count > self.peak:
+            self.peak = self.count
+
+    def update(self):
+        n = self.count
+        self.x[:n] += self.cos[:n] * self.speed[:n]
+        self.y[:n] += self.sin[:n] * self.speed[:n]
+        self.width[:n] -= self.decay[:n]
+        self.speed[:n] *= self.speed_decay[:n]
+        self.length[:n] *= self.length_decay[:n]
+        alive = self.width[:n] > 0
+        m = int(alive.sum())
+        if m != n:
+            for arr in self.fields:
+                arr[:m] = arr[:n][alive]
+            self.count = m
+
+    def polygons(self, offset, size=(WIDTH, HEIGHT)):
+        # [[tip, side, tail, side]] in display coordinates, one per live spark that reaches the screen
+        n = self.count
+        x = self.x[:n] - offset[0]
+        y = self.y[:n] - offset[1]
+        reach = self.length[:n] + self.width[:n]
+        on_screen = (x + reach >= 0) & (x - reach < size[0]) & (y + reach >= 0) & (y - reach < size[1])
+        x = x[on_screen]
+        y = y[on_screen]
+        cos = self.cos[:n][on_screen]
+        sin = self.sin[:n][on_screen]
+        length = self.length[:n][on_screen]
+        width = self.width[:n][on_screen]
+        lx = cos * length
+        ly = sin * length
+        wx = sin * width                # the width runs across the angle, +-90 degrees
+        wy = cos * width
+        points = np.stack((x + lx, y + ly, x - wx, y + wy, x - lx, y - ly, x + wx, y - wy), axis=1)
+        return points.reshape(-1, 4, 2).tolist()
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def stats(self) -> dict:
+        return {'live': self.count, 'peak': self.peak, 'dropped': self.dropped, 'capacity': self.capacity}
@@ -0,0 +1,53 @@
+import threading
+
+'''
+    reads upcoming maps on a worker thread while the current level is played
+    the worker only parses and decodes (Tile_Map.read_map), the swap itself happens in Tile_Map.load_map
+    on the main thread. the level transition holds its closed circle until ready() so a level
+    change never waits on disk, only maps that were never requested are read synchronously
+'''
+
+class Map_Preloader:
+    def __init__(self, tile_map) -> None:
+        self.tile_map = tile_map
+        self.lock = threading.Lock()
+        self.results = {}
+        self.pending = {}           # map -> reading thread
+
+    def request(self, map):
+        with self.lock:
+            if map in self.results or map in self.pending:
+                return
+            thread = self.pending[map] = threading.Thread(target=self.read, args=(map,), daemon=True)
+            thread.start()
+
+    def read(self, map):
+        try:
+            map_data = self.tile_map.read_map(map)
+        except Exception as e:
+            print(f'preloading map {map} failed: {e}')
+            map_data = None
+        with self.lock:
+            self.pending.pop(map, None)
+            if map_data is not None:
+                self.results[map] = map_data
+
+    def take(self, map):
+        # preloaded map data, or None when map was never requested (caller loads synchronously)
+        # a read still in flight is waited on, it is further along than starting over,
+        # only the first map at startup gets here before its read is done
+        with self.lock:
+            thread = self.pending.get(map)
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            return self.results.pop(map, None)
+
+    def ready(self, map):
+        with self.lock:
+            return map in self.results
+
+    def requested(self, map):
+        # being read or already read, a failed read counts as never requested
+        with self.lock:
+            return map in self.results or map in self.pending
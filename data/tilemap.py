@@ -1,8 +1,12 @@
 import pygame as pg 
+import numpy as np
 import os, sys, json
 from enum import Enum
 from .settings import *
-from .utils import get_image, load_img
+from .utils import get_image, get_cached_image, image_cache, load_img
+from .map_format import load_cooked
+from .map_saver import Map_Saver, replay_journal, journal_path
+from .edit_log import Edit_Log
 false = False
 true = True
 
@@ -20,6 +24,11 @@ true = True
 '''
 
 MAP_PATH = 'data/maps/'
+CHUNK_SIZE = 16                 # cells per chunk side, static layers get pre-baked per chunk
+CHUNK_PX = CHUNK_SIZE * CELL_SIZE
+AUTOSAVE_INTERVAL = 30          # seconds between editor autosaves
+JOURNAL_LIMIT = 2000            # journaled edits before the editor rewrites the whole map
+FLOOD_LIMIT = 20000             # max cells a flood fill may cover before it counts as unbounded
 
 top_left = 0
 top_center = 1
@@ -47,6 +56,14 @@ tile_offsets = [
     (1, 0), (-1, 0), (0, 1), (0, -1)
 ]
 
+# neighbour mask -> auto tile variant, one bit per entry of tile_offsets
+auto_tile_masks: dict = {}
+for neighbours, variant in auto_tile_config.items():
+    mask = 0
+    for offset in neighbours:
+        mask |= 1 << tile_offsets.index(offset)
+    auto_tile_masks[mask] = variant
+
 SURROUND_POS = [
     [-1, 0],
     [0, 0],
@@ -71,6 +88,61 @@ def str_to_tuple(str):
     key = str.split(',')
     return (int(key[0]), int(key[1]))
 
+def spill_chunks(pos):
+    # chunks a tile at pos can draw into, it may spill one cell right/down
+    return set(((pos[0] + dx) // CHUNK_SIZE, (pos[1] + dy) // CHUNK_SIZE) for dx in (0, 1) for dy in (0, 1))
+
+def tile_size(tile):
+    if tile[1] == 'decor' and tile[2] == 2:
+        return [CELL_SIZE*1.5, CELL_SIZE*1.5]
+    return [CELL_SIZE, CELL_SIZE]
+
+def tile_image(tile):
+    return get_cached_image(tile[3], tile_size(tile))
+
+class Decor(Enum):
+    LEFT_TORCH = 0
+    RIGHT_TORCH = 1
+    BIG_TORCH = 2
+
+'''
+    light emitters per decor id, offsets are pixels from the tile's top left
+        glows:          glow centers, the outer and inner flame glow
+        spawns:         light particle spawn points
+        spawn_chance:   one roll of randint(1, spawn_chance) per frame, roll n spawns at spawns[n - 1]
+        rise:           vertical speed range of spawned particles
+'''
+EMITTERS = {
+    Decor.LEFT_TORCH.value: {'glows': [(10, 4), (10, 4)], 'spawns': [(12, 4)], 'spawn_chance': 6, 'rise': (-.7, -.4)},
+    Decor.RIGHT_TORCH.value: {'glows': [(10, 4), (10, 4)], 'spawns': [(4, 2)], 'spawn_chance': 6, 'rise': (-.6, -.4)},
+    Decor.BIG_TORCH.value: {'glows': [(11, 7), (13, 10)], 'spawns': [(3, 7), (22, 7)], 'spawn_chance': 8, 'rise': (-.6, -.4)},
+}
+EMITTER_MARGIN = 64             # px, covers the largest glow radius so edge lights don't pop
+
+class Light_Emitter:
+    def __init__(self, pos, kind) -> None:
+        config = EMITTERS[kind]
+        self.tile_pos = pos
+        self.pos = (pos[0] * CELL_SIZE, pos[1] * CELL_SIZE)
+        self.kind = kind
+        self.flicker = (pos[1] % 100 + 200) / 300 * 0.08     # torch_sin = sin(flicker * total_time)
+        self.glows = config['glows']
+        self.spawns = config['spawns']
+        self.spawn_chance = config['spawn_chance']
+        self.rise = config['rise']
+
+# solidity flags, SOLID blocks entities, HARD is what particles bounce off
+SOLID = 1
+HARD = 2
+
+def tile_flags(tile):
+    flags = 0
+    if tile[1] != 'decor' and tile[1][:2] != 'bg':
+        flags |= SOLID
+    if tile[1] == 'tileset_0':
+        flags |= HARD
+    return flags
+
 TILE_PATH = 'data/assets/tiles/'
 HIT_TILE_PATH = 'data/assets/tiles/tileset/'
 OBJ_TILE_PATH = 'data/assets/tiles/objects/'
@@ -83,78 +155,276 @@ class Tile_Map:
         self.enemies = []
         self.background_objects = []
         self.all_layers = []
+        self.emitters = {}
+        self.emitter_chunks = {}
+        self.chunk_keys = set()
+        self.chunks = {}
+        self.grid_origin = (0, 0)
+        self.grid_size = (0, 0)
+        self.solid = bytearray()
+        self.solid_rects = []
 
     def render(self, surf, offset):
-        for c in range(int(0 + offset[0] // CELL_SIZE) - 1, int((COLS*CELL_SIZE + offset[0]) // CELL_SIZE) + 2):
-            for r in range(int(0 + offset[1] // CELL_SIZE) - 1, int((ROWS*CELL_SIZE + offset[1]) // CELL_SIZE) + 2):
-                pos = (c, r)
-                if pos in self.tile_map:
-                    for layer, data in self.tile_map[pos].items():
-                        surf.blit(data[3], ((int(pos[0]) * CELL_SIZE) - offset[0], (int(pos[1]) * CELL_SIZE) - offset[1]))
-
-    def get_visible_tiles(self, offset):
-        layers = {l: [] for l in self.all_layers}
-        for c in range(int(0 + offset[0] // CELL_SIZE) - 1, int((COLS*CELL_SIZE + offset[0]) // CELL_SIZE) + 2):
-            for r in range(int(0 + offset[1] // CELL_SIZE) - 1, int((ROWS*CELL_SIZE + offset[1]) // CELL_SIZE) + 2):
-                pos = (c, r)
-                if pos in self.tile_map:
-                    for layer, data in self.tile_map[pos].items():
-                        tile_data = [pos] + data
-                        layers[layer].append(tile_data)
-        return layers
-
-    def load_map(self, map):
+        # blit the pre-baked chunks overlapping the camera, load_map bakes them all,
+        # chunks invalidated by an edit are baked again on their next view
+        for cx in range(int(offset[0] // CHUNK_PX), int((WIDTH + offset[0]) // CHUNK_PX) + 1):
+            for cy in range(int(offset[1] // CHUNK_PX), int((HEIGHT + offset[1]) // CHUNK_PX) + 1):
+                key = (cx, cy)
+                if key not in self.chunk_keys:
+                    continue
+                if key not in self.chunks:
+                    self.chunks[key] = self.bake_chunk(key)
+                chunk = self.chunks[key]
+                if chunk:
+                    # floored, so every tile on screen lands on the pixel its own blit would truncate to
+                    surf.blit(chunk, ((cx * CHUNK_PX - offset[0]) // 1, (cy * CHUNK_PX - offset[1]) // 1))
+
+    def bake_chunk(self, key):
+        # one cell of margin on the top/left picks up oversized tiles (big torch) spilling into this chunk
+        chunk = pg.Surface((CHUNK_PX, CHUNK_PX), pg.SRCALPHA)
+        x0 = key[0] * CHUNK_SIZE
+        y0 = key[1] * CHUNK_SIZE
+        # layer by layer in all_layers order, as the game drew its visible tiles
+        blits = 0
+        for layer in self.all_layers:
+            for x in range(x0 - 1, x0 + CHUNK_SIZE):
+                for y in range(y0 - 1, y0 + CHUNK_SIZE):
+                    pos = (x, y)
+                    if pos in self.tile_map and layer in self.tile_map[pos]:
+                        chunk.blit(self.tile_map[pos][layer][3], ((x - x0) * CELL_SIZE, (y - y0) * CELL_SIZE))
+                        blits += 1
+        if blits == 0:
+            return None
+        return chunk
+
+    def invalidate(self, pos):
+        for key in spill_chunks(pos):
+            self.chunks.pop(key, None)
+
+    def set_tile(self, pos, layer, tile):
+        pos = tuple(pos)
+        if isinstance(tile[3], str):
+            tile = tile.copy()
+            tile[3] = tile_image(tile)
+        if pos not in self.tile_map:
+            self.tile_map[pos] = {}
+        self.tile_map[pos][layer] = tile
+        if layer not in self.all_layers:
+            self.all_layers.append(layer)
+            self.all_layers.sort()
+        if tile[1] == 'decor':
+            self.add_emitter(pos, tile)
+        self.chunk_keys.update(spill_chunks(pos))
+        self.invalidate(pos)
+        self.update_solidity(pos)
+
+    def apply_edits(self, edits):
+        # [(pos, layer, tile or None)], e.g. from the editor's Edit_Log, only the touched chunks get re-baked
+        for pos, layer, tile in edits:
+            if tile is None:
+                self.remove_tile(pos, layer)
+            else:
+                self.set_tile(pos, layer, tile)
+
+    def remove_tile(self, pos, layer):
+        pos = tuple(pos)
+        if pos in self.tile_map and layer in self.tile_map[pos]:
+            tile = self.tile_map[pos][layer]
+            del self.tile_map[pos][layer]
+            if len(self.tile_map[pos]) == 0:
+                del self.tile_map[pos]
+            if tile[1] == 'decor':
+                self.remove_emitter(pos)
+            self.invalidate(pos)
+            self.update_solidity(pos)
+
+    # ------- LIGHT EMITTERS ------- #
+    def add_emitter(self, pos, tile):
+        if tile[2] not in EMITTERS:
+            return
+        self.remove_emitter(pos)
+        emitter = Light_Emitter(pos, tile[2])
+        self.emitters[pos] = emitter
+        key = (pos[0] // CHUNK_SIZE, pos[1] // CHUNK_SIZE)
+        if key not in self.emitter_chunks:
+            self.emitter_chunks[key] = []
+        self.emitter_chunks[key].append(emitter)
+
+    def remove_emitter(self, pos):
+        emitter = self.emitters.pop(pos, None)
+        if emitter:
+            key = (pos[0] // CHUNK_SIZE, pos[1] // CHUNK_SIZE)
+            self.emitter_chunks[key].remove(emitter)
+            if not self.emitter_chunks[key]:
+                del self.emitter_chunks[key]
+
+    def get_visible_emitters(self, offset):
+        emitters = []
+        x0 = offset[0] - EMITTER_MARGIN
+        y0 = offset[1] - EMITTER_MARGIN
+        x1 = offset[0] + WIDTH + EMITTER_MARGIN
+        y1 = offset[1] + HEIGHT + EMITTER_MARGIN
+        for cx in range(int(x0 // CHUNK_PX), int(x1 // CHUNK_PX) + 1):
+            for cy in range(int(y0 // CHUNK_PX), int(y1 // CHUNK_PX) + 1):
+                for emitter in self.emitter_chunks.get((cx, cy), ()):
+                    if x0 <= emitter.pos[0] <= x1 and y0 <= emitter.pos[1] <= y1:
+                        emitters.append(emitter)
+        return emitters
+
+    def read_map(self, map, decode=True, objects=False):
+        # parses a map without touching the display, safe to run on a worker thread
+        # tiles keep their asset path in tile[3] until load_map resolves them to surfaces
+        # objects: keep object tiles in the tile map (editor), the game only reports them
         res_data = {}
         unhitable_tiles = {}
         enemies = []
         all_layers: set = set()
 
         path = f'{MAP_PATH}{map}.json'
-        fl = open(path, 'r')
-        map_data = json.load(fl)
-        fl.close()
-
-        for k, layers in map_data['tile_map'].items():
-            key = str_to_tuple(k)
-            res_data[key] = {}
-            unhitable_tiles[key] = {}
-            for layer, tile in layers.items():
-                if tile[0] == 'objects':
-                    print('object: ', tile) 
-                else:
-                    if tile[1] == 'decor':
-                        if tile[2] == 2:
-                            tile[3] = get_image(tile[3], [CELL_SIZE*1.5, CELL_SIZE*1.5])
-                        else:
-                            tile[3] = get_image(tile[3], [CELL_SIZE, CELL_SIZE])    
+        cooked = None
+        if not os.path.exists(journal_path(path)):
+            cooked = load_cooked(path)
+        if cooked:
+            # placed tiles come out as arrays in json order, only the tile_map dicts are built here
+            xs, ys, layer_ids, tile_ids = cooked.entries()
+            is_object = np.array([t[0] == 'objects' for t in cooked.tiles] or [False])[tile_ids - 1]
+            if not objects:
+                for tile_id in np.unique(tile_ids[is_object]).tolist():
+                    print('object: ', cooked.tiles[tile_id - 1])
+                keep = ~is_object
+                xs, ys, layer_ids, tile_ids = xs[keep], ys[keep], layer_ids[keep], tile_ids[keep]
+            layers = cooked.layers
+            tiles = cooked.tiles
+            for x, y, li, tile_id in zip(xs.tolist(), ys.tolist(), layer_ids.tolist(), tile_ids.tolist()):
+                key = (x, y)
+                if key not in res_data:
+                    res_data[key] = {}
+                res_data[key][layers[li]] = tiles[tile_id - 1].copy()
+            all_layers.update(layers[li] for li in np.unique(layer_ids).tolist())
+        else:
+            fl = open(path, 'r')
+            map_data = json.load(fl)
+            fl.close()
+            replay_journal(path, map_data['tile_map'])
+
+            for k, layers in map_data['tile_map'].items():
+                key = str_to_tuple(k)
+                res_data[key] = {}
+                unhitable_tiles[key] = {}
+                for layer, tile in layers.items():
+                    if tile[0] == 'objects' and not objects:
+                        print('object: ', tile) 
                     else:
-                        tile[3] = get_image(tile[3], [CELL_SIZE, CELL_SIZE])
-                    res_data[key][layer] = tile
-            for layer in res_data[key]:
-                all_layers.add(layer)
-            if len(res_data[key]) == 0:
-                del res_data[key]
-            if len(unhitable_tiles[key]) == 0:
-                del unhitable_tiles[key]
-
-        self.tile_map = res_data  # map_data['tile_map']
-        self.unhitable_tiles = unhitable_tiles
+                        res_data[key][layer] = tile
+                for layer in res_data[key]:
+                    all_layers.add(layer)
+                if len(res_data[key]) == 0:
+                    del res_data[key]
+                if len(unhitable_tiles[key]) == 0:
+                    del unhitable_tiles[key]
+
+        if decode:
+            decoded = set()
+            for layers in res_data.values():
+                for tile in layers.values():
+                    key = (tile[3], tuple(tile_size(tile)))
+                    if key not in decoded:
+                        decoded.add(key)
+                        image_cache.decode(tile[3], tile_size(tile))
 
         sorted_layer_list = list(all_layers)
         sorted_layer_list.sort()
-        self.all_layers = sorted_layer_list
-
-        self.enemies = enemies
+        return {
+            'tile_map': res_data,
+            'unhitable_tiles': unhitable_tiles,
+            'all_layers': sorted_layer_list,
+            'enemies': enemies,
+        }
+
+    def load_map(self, map, map_data=None):
+        # map_data: result of read_map, e.g. preloaded in the background, read now when missing
+        if map_data is None:
+            map_data = self.read_map(map, decode=False)
+        res_data = map_data['tile_map']
+        for layers in res_data.values():
+            for tile in layers.values():
+                tile[3] = tile_image(tile)
+
+        self.tile_map = res_data
+        self.unhitable_tiles = map_data['unhitable_tiles']
+        self.all_layers = map_data['all_layers']
+        self.enemies = map_data['enemies']
+        self.emitters = {}
+        self.emitter_chunks = {}
+        for key, layers in res_data.items():
+            for tile in layers.values():
+                if tile[1] == 'decor':
+                    self.add_emitter(key, tile)
+        self.chunk_keys = set()
+        for pos in res_data:
+            self.chunk_keys.update(spill_chunks(pos))
+        self.chunks = {}
+        for key in self.chunk_keys:
+            self.chunks[key] = self.bake_chunk(key)
+        self.build_solidity()
+
+    # ------- SOLIDITY GRID ------- #
+    def build_solidity(self):
+        # dense flag grid over the map bounds, one byte per cell, plus a prebuilt rect for every solid cell
+        if self.tile_map:
+            x0 = min(pos[0] for pos in self.tile_map)
+            y0 = min(pos[1] for pos in self.tile_map)
+            w = max(pos[0] for pos in self.tile_map) - x0 + 1
+            h = max(pos[1] for pos in self.tile_map) - y0 + 1
+        else:
+            x0 = y0 = w = h = 0
+        self.grid_origin = (x0, y0)
+        self.grid_size = (w, h)
+        self.solid = bytearray(w * h)
+        self.solid_rects = [None] * (w * h)
+        for pos in self.tile_map:
+            self.update_solidity(pos)
+
+    def update_solidity(self, pos):
+        x = pos[0] - self.grid_origin[0]
+        y = pos[1] - self.grid_origin[1]
+        if not (0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]):
+            self.build_solidity()
+            return
+        flags = 0
+        if pos in self.tile_map:
+            for tile in self.tile_map[pos].values():
+                flags |= tile_flags(tile)
+        i = y * self.grid_size[0] + x
+        self.solid[i] = flags
+        if flags & SOLID:
+            self.solid_rects[i] = pg.Rect(pos[0] * CELL_SIZE, pos[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        else:
+            self.solid_rects[i] = None
+
+    def cell_flags(self, tx, ty):
+        x = tx - self.grid_origin[0]
+        y = ty - self.grid_origin[1]
+        if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]:
+            return self.solid[y * self.grid_size[0] + x]
+        return 0
+
+    def is_solid(self, tx, ty):
+        return self.cell_flags(tx, ty) & SOLID != 0
 
     def get_surrounding_tiles(self, pos):
+        # a new list every call, the rects in it are shared with the grid so copy one before changing it
         tiles = []
-        pos = [pos[0] // CELL_SIZE, pos[1] // CELL_SIZE]
-        for offset in SURROUND_POS:
-            key = (pos[0] + offset[0], pos[1] + offset[1])
-            if key in self.tile_map:
-                for layer in self.tile_map[key]:
-                    if self.tile_map[key][layer][1] != 'decor' and self.tile_map[key][layer][1][:2] != 'bg': 
-                        tiles.append(pg.Rect(key[0] * CELL_SIZE, key[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+        x = int(pos[0] // CELL_SIZE) - self.grid_origin[0]
+        y = int(pos[1] // CELL_SIZE) - self.grid_origin[1]
+        w, h = self.grid_size
+        rects = self.solid_rects
+        for ry in range(max(0, y - 2), min(h, y + 3)):
+            row = ry * w
+            for rx in range(max(0, x - 2), min(w, x + 3)):
+                rect = rects[row + rx]
+                if rect is not None:
+                    tiles.append(rect)
         return tiles
 
     def get_nearby_rects(self, pos):
@@ -167,54 +437,124 @@ class Tile_Map:
         return tiles
 
     def tile_collide(self, pos):
-        tile_pos = (int(pos[0] // CELL_SIZE), int(pos[1] // CELL_SIZE))
-        if tile_pos in self.tile_map:
-            for layer, tile in self.tile_map[tile_pos].items():
-                if tile[1] in ['tileset_0']:
-                    return True
-        return False
+        return self.cell_flags(int(pos[0] // CELL_SIZE), int(pos[1] // CELL_SIZE)) & HARD != 0
+
+    def hard_cells(self, xs, ys):
+        w, h = self.grid_size
+        hits = np.zeros(len(xs), dtype=bool)
+        if w * h == 0:
+            return hits
+        grid = np.frombuffer(self.solid, dtype=np.uint8).reshape(h, w)
+        tx = np.floor_divide(xs, CELL_SIZE).astype(np.int64) - self.grid_origin[0]
+        ty = np.floor_divide(ys, CELL_SIZE).astype(np.int64) - self.grid_origin[1]
+        inside = (tx >= 0) & (tx < w) & (ty >= 0) & (ty < h)
+        hits[inside] = (grid[ty[inside], tx[inside]] & HARD) != 0
+        return hits
+
+    def tile_collide_batch(self, pos, vel):
+        # pos, vel: (n, 2) arrays. moves along x first, then y from the resolved x, same as calling tile_collide per axis
+        # returns (hit_x, hit_y) bool arrays, a hit means that axis step lands inside a hard tile
+        pos = np.asarray(pos, dtype=np.float64).reshape(-1, 2)
+        vel = np.asarray(vel, dtype=np.float64).reshape(-1, 2)
+        x = pos[:, 0] + vel[:, 0]
+        hit_x = self.hard_cells(x, pos[:, 1])
+        x[hit_x] = pos[hit_x, 0]
+        hit_y = self.hard_cells(x, pos[:, 1] + vel[:, 1])
+        return hit_x, hit_y
 
 class Level_Editor:
     def __init__(self, app) -> None:
         self.app = app
         self.tile_data = []
+        self.tileset_paths = {}         # tile name -> sorted image paths, for auto tiling
         self.tile_map = {}
         self.layers = set()
+        self.auto_tiling = False        # re-resolve edited cells and their neighbours on every add/remove
+        self.map_path = None
+        self.saver = None
+        self.unsaved_edits = 0
+        self.journal_edits = 0          # edits journaled since the last full write
+        self.autosave_timer = 0
+        self.clipboard = {}
+        self.edit_log = Edit_Log()
+        self.edit_log.listeners.append(self.journal_edit)
         self.get_tile_data()
 
     def render(self, surf, offset):
-        for pos, layers in self.tile_map.items():
-            for layer, data in layers.items():
-                img = get_image(data[3], [CELL_SIZE, CELL_SIZE])
-                if data[1] == 'decor':
-                    img = load_img(data[3])
-                surf.blit(
-                    img, ((pos[0] * CELL_SIZE) - offset[0], (pos[1] * CELL_SIZE) - offset[1]))
+        # only the cells inside the viewport, images come from the shared cache
+        for c in range(int(offset[0] // CELL_SIZE) - 1, int((WIDTH + offset[0]) // CELL_SIZE) + 1):
+            for r in range(int(offset[1] // CELL_SIZE) - 1, int((HEIGHT + offset[1]) // CELL_SIZE) + 1):
+                layers = self.tile_map.get((c, r))
+                if not layers:
+                    continue
+                for layer, data in layers.items():
+                    if data[1] == 'decor':
+                        img = get_cached_image(data[3])
+                    else:
+                        img = get_cached_image(data[3], [CELL_SIZE, CELL_SIZE])
+                    surf.blit(img, ((c * CELL_SIZE) - offset[0], (r * CELL_SIZE) - offset[1]))
 
     # ------- CREATING TILE MAP FUNCS ------ #
     def save_map(self):
-        new_tile_map = {}
-        layers_found = set()
-
-        for pos, layers in self.tile_map.items():
-            new_tile_map[tuple_to_str(pos)] = layers
-            for layer in layers:
-                layers_found.add(layer)
-
-        layers = []
-        for l in layers_found:
-            layers.append(l)
-
-        ln = len(os.listdir(MAP_PATH))
-        path = f'{MAP_PATH}/{ln}.json'
-        fl = open(path, 'w')
-        json.dump({
-            'all_layers': layers,
-            'tile_map': new_tile_map
-        }, fl)
-        fl.close()
-        for k, val in new_tile_map.items():
-            print(val)
+        # first save picks the next free map number, later saves go to the same file
+        # small saves only flush the edit journal, a full rewrite happens once it grows past JOURNAL_LIMIT
+        if self.saver is None:
+            ln = len([f for f in os.listdir(MAP_PATH) if f.endswith('.json')])
+            self.map_path = f'{MAP_PATH}{ln}.json'
+            self.saver = Map_Saver(self.map_path)
+            self.journal_edits = JOURNAL_LIMIT
+        if self.journal_edits >= JOURNAL_LIMIT:
+            self.saver.save(self.tile_map, self.layers)
+            self.journal_edits = 0
+        else:
+            self.saver.flush()
+        self.unsaved_edits = 0
+        self.autosave_timer = 0
+
+    def autosave(self, dt):
+        self.autosave_timer += dt
+        if self.autosave_timer >= AUTOSAVE_INTERVAL:
+            self.autosave_timer = 0
+            if self.saver and self.unsaved_edits:
+                self.save_map()
+
+    def record_edit(self, pos, layer, old, new):
+        self.edit_log.record(pos, layer, old, new)
+
+    def journal_edit(self, pos, layer, old, new):
+        self.unsaved_edits += 1
+        if self.saver:
+            self.saver.log(tuple_to_str(pos), str(layer), new)
+            self.journal_edits += 1
+
+    def close(self):
+        if self.saver:
+            if self.unsaved_edits:
+                self.save_map()
+            self.saver.close()
+
+    def open_map(self, map):
+        # reuses the game's loader, images are not decoded here, render pulls them in as they scroll into view
+        map_data = Tile_Map(self.app).read_map(map, decode=False, objects=True)
+        tile_map = {}
+        layers = set()
+        for pos, cell in map_data['tile_map'].items():
+            tile_map[pos] = {}
+            for layer, tile in cell.items():
+                layer = int(layer)
+                tile_map[pos][layer] = tile
+                layers.add(layer)
+        if self.saver:
+            self.saver.close()
+        self.tile_map = tile_map
+        self.layers = layers
+        self.map_path = f'{MAP_PATH}{map}.json'
+        self.saver = Map_Saver(self.map_path)
+        # a journal left by an earlier session is folded into the first save
+        self.journal_edits = JOURNAL_LIMIT if os.path.exists(journal_path(self.map_path)) else 0
+        self.unsaved_edits = 0
+        self.autosave_timer = 0
+        self.edit_log.clear()
 
     def save_to_json(self):
         pass
@@ -224,24 +564,166 @@ class Level_Editor:
 
     # -------- TILE EDITOR FUNCS ------- #
     def add_tile(self, pos, tile_data, layer):
-        key = tuple(pos)
-        if layer not in self.layers:
-            self.layers.add(layer)
-        if key not in self.tile_map:
-            self.tile_map[key] = {}
-            self.tile_map[key][layer] = tile_data
-        self.tile_map[key][layer] = tile_data
+        self.set_cells([(tuple(pos), layer, tile_data)])
 
     def remove_tile(self, pos, layer):
-        key = tuple(pos)
-        if key in self.tile_map:
-            if layer in self.tile_map[key]:
-                del self.tile_map[key][layer]
-                if len(self.tile_map[key]) == 0:
-                    del self.tile_map[key]
+        self.set_cells([(tuple(pos), layer, None)])
+
+    def set_cells(self, edits, auto_tile=True):
+        # one batched mutation: edits is [(pos, layer, tile or None)], auto tiling runs once per layer afterwards
+        # the whole batch, auto tiling included, is a single undo step
+        changed = {}
+        auto_tiled = self.auto_tiling and auto_tile
+        self.edit_log.begin()
+        for pos, layer, tile in edits:
+            layers = self.tile_map.get(pos)
+            old = layers.get(layer) if layers else None
+            if tile is None:
+                if old is None:
+                    continue
+                del layers[layer]
+                if len(layers) == 0:
+                    del self.tile_map[pos]
+            else:
+                if old == tile:
+                    continue
+                if auto_tiled and old is not None and old[:2] == tile[:2]:
+                    tile_imgs = self.tileset_paths.get(tile[1])
+                    variant = self.resolved_variant(pos, layer, tile_imgs)
+                    if variant is not None and old[2] == variant and old[3] == tile_imgs[variant]:
+                        continue        # auto tiling would set the tile already there straight back
+                if layer not in self.layers:
+                    self.layers.add(layer)
+                if layers is None:
+                    layers = self.tile_map[pos] = {}
+                layers[layer] = tile
+            self.record_edit(pos, layer, old, tile)
+            if layer not in changed:
+                changed[layer] = []
+            changed[layer].append(pos)
+        if auto_tiled:
+            for layer, cells in changed.items():
+                self.auto_tile_cells(cells, layer)
+        self.edit_log.end()
+        return changed
+
+    # -------- UNDO / REDO ------- #
+    def begin_edit(self):
+        self.edit_log.begin()
+
+    def end_edit(self):
+        self.edit_log.end()
+
+    def replay(self, edits):
+        # undo/redo edits already hold the auto tiled result, so no auto tiling and no new undo step
+        self.edit_log.replaying = True
+        try:
+            return self.set_cells(edits, auto_tile=False)
+        finally:
+            self.edit_log.replaying = False
+
+    def undo(self):
+        return self.replay(self.edit_log.undo())
+
+    def redo(self):
+        return self.replay(self.edit_log.redo())
+
+    # -------- BULK EDITS ------- #
+    def fill_rect(self, start, end, tile_data, layer):
+        edits = []
+        for x in range(min(start[0], end[0]), max(start[0], end[0]) + 1):
+            for y in range(min(start[1], end[1]), max(start[1], end[1]) + 1):
+                edits.append(((x, y), layer, tile_data))
+        return self.set_cells(edits)
+
+    def erase_rect(self, start, end, layer=None):
+        # layer None erases every layer
+        edits = []
+        for x in range(min(start[0], end[0]), max(start[0], end[0]) + 1):
+            for y in range(min(start[1], end[1]), max(start[1], end[1]) + 1):
+                layers = self.tile_map.get((x, y))
+                if layers:
+                    for l in list(layers):
+                        if layer is None or l == layer:
+                            edits.append(((x, y), l, None))
+        return self.set_cells(edits)
+
+    def flood_fill(self, start, tile_data, layer, limit=FLOOD_LIMIT):
+        # fills the empty region around start on the layer, bounded by tiles already on that layer
+        # regions bigger than limit are treated as unbounded and left alone
+        start = tuple(start)
+        if start in self.tile_map and layer in self.tile_map[start]:
+            return {}
+        region = {start}
+        stack = [start]
+        while stack:
+            pos = stack.pop()
+            for offset in tile_offsets:
+                n = (pos[0] + offset[0], pos[1] + offset[1])
+                if n in region:
+                    continue
+                layers = self.tile_map.get(n)
+                if layers and layer in layers:
+                    continue
+                region.add(n)
+                if len(region) > limit:
+                    print('flood fill region is not closed')
+                    return {}
+                stack.append(n)
+        return self.set_cells([(pos, layer, tile_data) for pos in region])
+
+    def copy_rect(self, start, end, layer=None):
+        # clipboard: {(dx, dy): {layer: tile}} relative to the top left of the selection
+        x0 = min(start[0], end[0])
+        y0 = min(start[1], end[1])
+        clipboard = {}
+        for x in range(x0, max(start[0], end[0]) + 1):
+            for y in range(y0, max(start[1], end[1]) + 1):
+                layers = self.tile_map.get((x, y))
+                if layers:
+                    cell = {l: tile for l, tile in layers.items() if layer is None or l == layer}
+                    if cell:
+                        clipboard[(x - x0, y - y0)] = cell
+        self.clipboard = clipboard
+        return clipboard
+
+    def paste(self, pos, layer=None):
+        # layer None keeps the copied layers, otherwise everything lands on layer
+        edits = []
+        for (dx, dy), cell in self.clipboard.items():
+            for l, tile in cell.items():
+                edits.append(((pos[0] + dx, pos[1] + dy), l if layer is None else layer, tile))
+        return self.set_cells(edits)
+
+    def neighbour_mask(self, pos, layer):
+        mask = 0
+        for i, offset in enumerate(tile_offsets):
+            layers = self.tile_map.get((pos[0] + offset[0], pos[1] + offset[1]))
+            if layers and layer in layers:
+                mask |= 1 << i
+        return mask
+
+    def resolved_variant(self, pos, layer, tile_imgs):
+        # the variant auto tiling gives the tile at pos, None when it leaves the tile alone
+        if not tile_imgs:
+            return None
+        variant = auto_tile_masks.get(self.neighbour_mask(pos, layer))
+        if variant is not None and variant < len(tile_imgs):
+            return variant
+        return None
+
+    def resolve_tile(self, pos, layer, tile_imgs):
+        variant = self.resolved_variant(pos, layer, tile_imgs)
+        if variant is not None:
+            tile = self.tile_map[pos][layer]
+            if tile[2] != variant or tile[3] != tile_imgs[variant]:
+                # replaced, not mutated, saver snapshots share tile lists
+                new = [tile[0], tile[1], variant, tile_imgs[variant]]
+                self.tile_map[pos][layer] = new
+                self.record_edit(pos, layer, tile, new)
 
     def auto_tile(self, starting_pos, tileset_imgs, layer):
-        v = set()
+        # re-tiles the whole connected region on the layer, iterative so large regions can't hit the recursion limit
         key = tuple(starting_pos)
         if key not in self.tile_map:
             print('pos not in tile map')
@@ -250,25 +732,33 @@ class Level_Editor:
             print('pos in tile map, but incorrect layer')
             return
 
-        def dfs(pos, v: set):
-            if pos in v:
-                return
-            v.add(pos)
-            nearby_tiles = []
-            neighbors = []
+        tile_imgs = sorted(tileset_imgs)
+        v = {key}
+        stack = [key]
+        self.edit_log.begin()
+        while stack:
+            pos = stack.pop()
+            self.resolve_tile(pos, layer, tile_imgs)
+            for offset in tile_offsets:
+                n = (pos[0] + offset[0], pos[1] + offset[1])
+                if n not in v and n in self.tile_map and layer in self.tile_map[n]:
+                    v.add(n)
+                    stack.append(n)
+        self.edit_log.end()
+
+    def auto_tile_cells(self, cells, layer):
+        # incremental mode: only the changed cells and their 4-neighbours, each tile with its own tileset
+        touched = set()
+        for pos in cells:
+            touched.add(tuple(pos))
             for offset in tile_offsets:
-                search_pos = (pos[0] + offset[0], pos[1] + offset[1])
-                if search_pos in self.tile_map and layer in self.tile_map[search_pos]:
-                    nearby_tiles.append(offset)
-                    neighbors.append(search_pos)
-            auto_tile_key = tuple(sorted(nearby_tiles))
-            if auto_tile_key in auto_tile_config:
-                tile_imgs = sorted(tileset_imgs)
-                self.tile_map[pos][layer][3] = tile_imgs[auto_tile_config[auto_tile_key]]
-                self.tile_map[pos][layer][2] = auto_tile_config[auto_tile_key]
-            for n in neighbors:
-                dfs(n, v)
-        dfs(key, v)
+                touched.add((pos[0] + offset[0], pos[1] + offset[1]))
+        for pos in touched:
+            layers = self.tile_map.get(pos)
+            if layers and layer in layers:
+                tile_imgs = self.tileset_paths.get(layers[layer][1])
+                if tile_imgs:
+                    self.resolve_tile(pos, layer, tile_imgs)
 
     def tile_editor_display(self, surf, mouse_rect):
         pg.draw.rect(surf, (180, 180, 180), (0, 0, 200, HEIGHT))
@@ -288,3 +778,4 @@ class Level_Editor:
                         full_tile_img_path = f'{full_tile_name_path}/{tile_id}'
                         images.append(full_tile_img_path)
                 self.tile_data.append([tile_type, tile_name, images])
+                self.tileset_paths[tile_name] = sorted(images)
@@ -1,15 +1,161 @@
 import pygame as pg
-import math, random
+import math, random, threading, time, io, os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .atlas import atlas_image
+from .pixel_cache import pixel_cache
 false = False
 true = True
+LOADER_THREADS = max(2, min(8, os.cpu_count() or 1))
 
 def get_image(path: str, scale: list) -> pg.image:
-    img: pg.image = pg.image.load(path)
-    img = pg.transform.scale(img, (scale[0], scale[1])).convert_alpha()
+    img: pg.image = load_scaled(path, (int(scale[0]), int(scale[1])))
+    img = img.convert_alpha()
     return img
 
+class Image_Cache:
+    '''
+        process wide cache of decoded images
+        key: (path, (w, h)), every tile using the same image shares one surface
+            (path, factor) for a float scale of the file size, (path, None) for the file size
+        surfaces handed out are shared, never draw onto them
+        decode() can run on worker threads, it leaves convert_alpha to the main thread get()
+        prefetch() decodes a batch on a thread pool and converts each image as soon as it is ready
+        timings: key -> [decode ms, convert ms]
+    '''
+    def __init__(self) -> None:
+        self.images = {}
+        self.decoded = {}
+        self.timings = {}
+        self.lock = threading.Lock()
+        self.pool = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path: str, scale: list = None):
+        if isinstance(scale, float):
+            return (path, scale)
+        return (path, (int(scale[0]), int(scale[1])) if scale else None)
+
+    def get(self, path: str, scale: list = None) -> pg.Surface:
+        # scale None keeps the image at its file size
+        key = self.key(path, scale)
+        img = self.images.get(key)
+        if img is not None:
+            self.hits += 1
+            return img
+        with self.lock:
+            img = self.decoded.pop(key, None)
+        self.misses += 1
+        if img is None:
+            img = self.decode_key(key)
+        start = time.perf_counter()
+        img = img.convert_alpha()
+        with self.lock:
+            self.timings.setdefault(key, [0, 0])[1] = (time.perf_counter() - start) * 1000
+        self.images[key] = img
+        return img
+
+    def decode(self, path: str, scale: list = None):
+        key = self.key(path, scale)
+        with self.lock:
+            if key in self.images or key in self.decoded:
+                return
+        img = self.decode_key(key)
+        with self.lock:
+            self.decoded[key] = img
+
+    def decode_key(self, key):
+        start = time.perf_counter()
+        img = load_scaled(*key)
+        with self.lock:
+            self.timings.setdefault(key, [0, 0])[0] = (time.perf_counter() - start) * 1000
+        return img
+
+    def take(self, path: str, scale: list = None) -> pg.Surface:
+        # unconverted surface, prefetched when it was, not kept by the cache. for callers doing their own convert
+        key = self.key(path, scale)
+        with self.lock:
+            img = self.decoded.pop(key, None)
+        if img is None:
+            img = self.decode_key(key)
+        return img
+
+    def prefetch(self, jobs, raw=()):
+        # jobs: [(path, scale)] decoded on the pool and converted here as they finish
+        # raw: [(path, scale)] only decoded, picked up later with take()
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(LOADER_THREADS, thread_name_prefix='decode')
+        futures = {self.pool.submit(self.decode, path, scale): (path, scale) for path, scale in jobs}
+        raw_futures = [self.pool.submit(self.decode, path, scale) for path, scale in raw]
+        for future in as_completed(futures):
+            future.result()
+            self.get(*futures[future])
+        for future in raw_futures:
+            future.result()
+
+    def timing_report(self, top=10) -> str:
+        # decode times include pixel cache hits, which skip both the png decode and the scale
+        with self.lock:
+            rows = sorted(self.timings.items(), key=lambda item: -sum(item[1]))
+        lines = [f'{len(rows)} images  decode {sum(t[0] for k, t in rows):.1f}ms  convert {sum(t[1] for k, t in rows):.1f}ms']
+        for key, (decode, convert) in rows[:top]:
+            lines.append(f'  {decode:7.2f}ms {convert:7.2f}ms  {key[0]} {key[1] or ""}')
+        return '\n'.join(lines)
+
+    def resident_bytes(self) -> int:
+        total = 0
+        for img in self.images.values():
+            total += img.get_pitch() * img.get_height()
+        return total
+
+    def stats(self) -> dict:
+        return {
+            'images': len(self.images),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes': self.resident_bytes(),
+        }
+
+    def clear(self):
+        self.images.clear()
+        with self.lock:
+            self.decoded.clear()
+            self.timings.clear()
+        self.hits = 0
+        self.misses = 0
+
+image_cache = Image_Cache()
+
+def get_cached_image(path: str, scale: list = None) -> pg.Surface:
+    return image_cache.get(path, scale)
+
 def load_img(path):
-    img = pg.image.load(path)
+    # cooked atlas first, the png itself otherwise
+    img = atlas_image(path)
+    if img is None:
+        img = pg.image.load(path)
+    return img
+
+def decode_image(path):
+    # read the bytes then decode from memory, no display calls so it is safe on any thread
+    img = atlas_image(path)
+    if img is None:
+        fl = open(path, 'rb')
+        data = fl.read()
+        fl.close()
+        img = pg.image.load(io.BytesIO(data), path)
+    return img
+
+def load_scaled(path, size=None):
+    # size: None, (w, h) or a float factor. served from the pixel cache when it can, cached otherwise
+    img = pixel_cache.get(path, size)
+    if img is None:
+        img = decode_image(path)
+        if isinstance(size, float):
+            img = pg.transform.scale(img, (int(img.get_width() * size), int(img.get_height() * size)))
+        elif size is not None:
+            img = pg.transform.scale(img, size)
+        pixel_cache.put(path, size, img)
     return img
 
 def scale_img(img, scale):
@@ -59,7 +59,7 @@ class Mouse:
 
 
 class Tile_Editor:
-    def __init__(self) -> None:
+    def __init__(self, map=None) -> None:
         pg.init()
         self.screen: pg.display = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.display: pg.Surface = pg.Surface((WIDTH, HEIGHT))
@@ -83,6 +83,9 @@ class Tile_Editor:
         self.mouse = Mouse(self)
         self.level_editor = Level_Editor(self)
         self.curr_tile = None
+        self.selection = None           # [corner, corner] in tile coords, second corner None while selecting
+        if map is not None:
+            self.level_editor.open_map(map)
 
         pg.mouse.set_visible(False)
 
@@ -125,13 +128,14 @@ class Tile_Editor:
 
             img_offset = [0, 0]
             if self.tile_img_index > -1 and self.tile_img_index < len(tile_images):
-                img = get_image(tile_images[self.tile_img_index], [
-                                CELL_SIZE, CELL_SIZE])
                 if tile_name == 'decor':
-                    img = load_img(tile_images[self.tile_img_index])
+                    img = get_cached_image(tile_images[self.tile_img_index])
                 elif tile_name == 'buildings':
-                    img = get_image(tile_images[self.tile_img_index], [
+                    img = get_cached_image(tile_images[self.tile_img_index], [
                                     CELL_SIZE*1, CELL_SIZE*4])
+                else:
+                    img = get_cached_image(tile_images[self.tile_img_index], [
+                                CELL_SIZE, CELL_SIZE])
 
                 self.display.blit(img, (
                     (self.mouse.tile_pos[0] * CELL_SIZE) - img_offset[0],
@@ -151,17 +155,28 @@ class Tile_Editor:
 
         # --------- ADDING/REMOVING TILES --------- #
 
+        # one undo step per mouse stroke
+        if self.mouse.left_click == Click.JUST_PRESSED:
+            self.level_editor.begin_edit()
+        if self.mouse.left_click == Click.JUST_RELEASED:
+            self.level_editor.end_edit()
+
         if self.can_place_tile:
             tile_pos = [(self.mouse.pos[0] + self.offset[0]) // CELL_SIZE,
                         (self.mouse.pos[1] + self.offset[1]) // CELL_SIZE]
             if self.mouse.right_click == Click.JUST_PRESSED:
                 self.level_editor.remove_tile(tile_pos, self.layer)
             if self.mouse.left_click == Click.JUST_PRESSED or self.mouse.left_click == Click.PRESSED:
-                self.curr_tile[2].sort()
-                self.level_editor.add_tile(tile_pos,
-                                           [self.curr_tile[0], self.curr_tile[1], self.tile_img_index,
-                                               self.curr_tile[2][self.tile_img_index]],
-                                           self.layer, )
+                self.level_editor.add_tile(tile_pos, self.tile_to_place(), self.layer)
+
+        if self.selection:
+            corner = self.selection[1] if self.selection[1] else self.mouse_tile_pos()
+            x0 = min(self.selection[0][0], corner[0])
+            y0 = min(self.selection[0][1], corner[1])
+            x1 = max(self.selection[0][0], corner[0]) + 1
+            y1 = max(self.selection[0][1], corner[1]) + 1
+            pg.draw.rect(self.display, GREEN, (x0 * CELL_SIZE - self.offset[0], y0 * CELL_SIZE - self.offset[1],
+                                                (x1 - x0) * CELL_SIZE, (y1 - y0) * CELL_SIZE), 1)
 
         # ------------ RENDER TEXT ------------- #
 
@@ -183,6 +198,10 @@ class Tile_Editor:
             f'tile mode: { "Tile Mode" if can_place_tile else "Observe Mode" }', 10, False, WHITE)
         self.display.blit(object_text, [10, 70])
 
+        auto_tile_text = text_surface(
+            f'auto tile: { "True" if self.level_editor.auto_tiling else "False" }', 10, False, WHITE)
+        self.display.blit(auto_tile_text, [10, 90])
+
         # ------------ BLIT DISPLAYS ------------- #
 
         self.mouse.render(self.display)
@@ -190,20 +209,39 @@ class Tile_Editor:
         pg.display.flip()
         pg.display.update()
 
+    def mouse_tile_pos(self):
+        return [(self.mouse.pos[0] + self.offset[0]) // CELL_SIZE,
+                (self.mouse.pos[1] + self.offset[1]) // CELL_SIZE]
+
+    def tile_to_place(self):
+        self.curr_tile[2].sort()
+        return [self.curr_tile[0], self.curr_tile[1], self.tile_img_index, self.curr_tile[2][self.tile_img_index]]
+
+    def selected(self):
+        # (start, end) of a finished selection, None otherwise
+        if self.selection and self.selection[1]:
+            return self.selection[0], self.selection[1]
+        return None
+
     def update(self):
         self.clock.tick(FPS)
         pg.display.set_caption(f'{self.clock.get_fps()}')
         self.dt = self.clock.tick(FPS)
         self.dt /= 1000
+        self.level_editor.autosave(self.dt)
 
     def check_inputs(self):
         for e in pg.event.get():
             if e.type == pg.QUIT:
+                self.level_editor.close()
+                pixel_cache.save()
                 pg.quit()
                 sys.exit()
 
             if e.type == pg.KEYDOWN:
                 if e.key == pg.K_1:
+                    self.level_editor.close()
+                    pixel_cache.save()
                     pg.quit()
                     sys.exit()
                 if e.key == pg.K_a:
@@ -228,6 +266,33 @@ class Tile_Editor:
                     self.level_editor.save_map()
                 if e.key == pg.K_c:
                     self.can_place_tile = not self.can_place_tile
+                if e.key == pg.K_t:
+                    self.level_editor.auto_tiling = not self.level_editor.auto_tiling
+
+                # ---- BULK EDITS ---- #
+                if e.key == pg.K_x:
+                    if self.selection is None or self.selection[1]:
+                        self.selection = [self.mouse_tile_pos(), None]
+                    else:
+                        self.selection[1] = self.mouse_tile_pos()
+                if e.key == pg.K_ESCAPE:
+                    self.selection = None
+                if e.key == pg.K_g and self.selected() and self.curr_tile:
+                    self.level_editor.fill_rect(*self.selected(), self.tile_to_place(), self.layer)
+                if e.key == pg.K_h and self.curr_tile:
+                    self.level_editor.flood_fill(self.mouse_tile_pos(), self.tile_to_place(), self.layer)
+                # with shift, erase/copy/paste work on every layer
+                edit_layer = None if e.mod & pg.KMOD_SHIFT else self.layer
+                if e.key == pg.K_BACKSPACE and self.selected():
+                    self.level_editor.erase_rect(*self.selected(), edit_layer)
+                if e.key == pg.K_k and self.selected():
+                    self.level_editor.copy_rect(*self.selected(), edit_layer)
+                if e.key == pg.K_p:
+                    self.level_editor.paste(self.mouse_tile_pos(), edit_layer)
+                if e.key == pg.K_z:
+                    self.level_editor.undo()
+                if e.key == pg.K_y:
+                    self.level_editor.redo()
 
                 if e.key == pg.K_f:
                     if self.curr_tile:
@@ -273,5 +338,6 @@ class Tile_Editor:
 
 
 if __name__ == '__main__':
-    app = Tile_Editor()
+    # python level_editor.py [map number], opens data/maps/<n>.json and saves back to it
+    app = Tile_Editor(int(sys.argv[1]) if len(sys.argv) > 1 else None)
     app.run()
@@ -1,8 +1,11 @@
 import pygame as pg
-import sys 
+import sys, os
 from enum import Enum
 from data.asset_manager import Asset_Manager
-from data.tilemap import Tile_Map 
+from data.tilemap import Tile_Map, Decor, MAP_PATH
+from data.preloader import Map_Preloader
+from data.lighting import Light_Map
+from data.pools import *
 from data.settings import *
 from data.entities import * 
 from data.particles import * 
@@ -14,11 +17,6 @@ inf = float('inf')
 n_inf = float('-inf')
 MAX_ROUNDS = 4
 
-class Decor(Enum):
-    LEFT_TORCH = 0
-    RIGHT_TORCH = 1
-    BIG_TORCH = 2
-
 class State(Enum):
     START_MENU = 0
     PAUSE = 1
@@ -44,15 +42,26 @@ class Data:
 
         self.enemies = []
 
-        self.particles = []
-        self.sparks = []
-        self.circles = []
-        self.circle_particles = []
+        self.particles = Particle_System()
+        self.sparks = Spark_Pool(SPARKS)
+        self.circles = Pool(Circle, CIRCLES)
+        self.circle_particles = Pool(Circle_Particle, CIRCLE_PARTICLES)
         self.enemy_projectiles = []
         self.transition = [350, 1,8 ,'closing'] #pos, width  
 
+        # -------- ASSETS -------- #
+        # the first map is read and every image decoded on worker threads, only converts run here
+        start = time.perf_counter()
         self.asset_manager = Asset_Manager()
         self.tile_map = Tile_Map(self)
+        self.preloader = Map_Preloader(self.tile_map)
+        self.preloader.request(self.e_handler.level)
+        projectile_size = [CELL_SIZE//1.5, CELL_SIZE//1.5]
+        self.asset_manager.prefetch(['player'],
+            projectile_image_jobs('data/assets/images/projectiles', projectile_size) +
+            [('data/assets/images/ui/0.png', [CELL_SIZE, CELL_SIZE])],
+            raw=particle_image_jobs('data/assets/images/particles'))
+
         self.load_map(self.e_handler.level)
         self.count = [0,0]
 
@@ -63,17 +72,21 @@ class Data:
         }
 
         load_particle_images('data/assets/images/particles')
-        load_projectile_images('data/assets/images/projectiles', [CELL_SIZE//1.5, CELL_SIZE//1.5])
-        self.heart_img = get_image('data/assets/images/ui/0.png', [CELL_SIZE, CELL_SIZE])
+        load_projectile_images('data/assets/images/projectiles', projectile_size)
+        self.heart_img = get_cached_image('data/assets/images/ui/0.png', [CELL_SIZE, CELL_SIZE])
+        pixel_cache.save()
+        if '--load-times' in sys.argv:
+            print(f'assets loaded in {(time.perf_counter() - start) * 1000:.1f}ms')
+            print(image_cache.timing_report())
 
     def reset(self):
         self.player = None
         self.inputs = [False, False, False, False]
         self.screenshake = 0
-        self.particles = []
-        self.sparks = []
-        self.circles = []
-        self.circle_particles = []
+        self.particles.clear()
+        self.sparks.clear()
+        self.circles.clear()
+        self.circle_particles.clear()
         self.enemy_projectiles = []
         self.total_time = 0
         self.e_handler.reset()
@@ -84,10 +97,10 @@ class Data:
         self.player = None
         self.inputs = [False, False, False, False]
         self.screenshake = 0
-        self.particles = []
-        self.sparks = []
-        self.circles = []
-        self.circle_particles = []
+        self.particles.clear()
+        self.sparks.clear()
+        self.circles.clear()
+        self.circle_particles.clear()
         self.enemy_projectiles = []
         self.total_time = 0
         self.e_handler.hard_reset()
@@ -96,10 +109,18 @@ class Data:
 
     def game_on(self): return self.e_handler.state == State.GAME_ON or self.e_handler.state == State.TUTORIAL
 
+    def next_map_ready(self):
+        # a requested next map has to finish preloading first, an unrequested one is loaded synchronously
+        next_map = self.e_handler.level + 1
+        return self.preloader.ready(next_map) or not self.preloader.requested(next_map)
+
     def load_map(self, map_name):
         self.player = Player(self, self.e_handler.starting_pos(), [CELL_SIZE, CELL_SIZE], 'player', True)
-        self.tile_map.load_map(map_name)
+        self.tile_map.load_map(map_name, self.preloader.take(map_name))
         self.edges = [inf, n_inf, inf, n_inf]
+        next_map = map_name + 1
+        if next_map < MAX_ROUNDS and os.path.exists(f'{MAP_PATH}{next_map}.json'):
+            self.preloader.request(next_map)
 
         # -------- MAP DATA -------- #
         for pos in self.tile_map.tile_map:
@@ -132,6 +153,7 @@ class Event_Handler:
         }
         self.level_times = [80, 100, 120, 140]
         self.level_start_pos = [120, 240, 200, 240]
+        self.level_ambient = [(0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0)]     # added under every light, per level
 
     def reset(self): 
         self.level_timer = 0
@@ -150,6 +172,9 @@ class Event_Handler:
     def starting_pos(self):
         return self.starting_positions[self.level]
 
+    def ambient(self):
+        return self.level_ambient[min(self.level, len(self.level_ambient) - 1)]
+
 class App:
     def __init__(self) -> None:
         pg.init()
@@ -159,6 +184,7 @@ class App:
         self.clock: pg.time = pg.time.Clock()
         
         self.data = Data(self)
+        self.light_map = Light_Map()
         self.inputs = [False, False, False, False]
         self.left_clicked = False
         self.mouse_pos = [0, 0]
@@ -169,6 +195,7 @@ class App:
 
         # ----- SETUP ----- #
         self.base_display.fill((20, 0, 16))
+        self.light_map.clear(self.data.e_handler.ambient())
 
         # ---- UPDATE DATA ---- #
         self.data.left_clicked = self.left_clicked
@@ -194,81 +221,10 @@ class App:
 
         # --------- MAIN RENDER ACTIONS ---------- #
 
-        layers = self.data.tile_map.get_visible_tiles(self.data.offset)
-        for n, layer in layers.items():
-            for tile in layer:
-                
-                real_pos = [tile[0][0] * CELL_SIZE, tile[0][1] * CELL_SIZE]
-                self.base_display.blit( tile[4], (real_pos[0] - self.data.offset[0], real_pos[1] - self.data.offset[1]) )
-
-                if tile[2] == 'decor':
-                    if tile[3] == Decor.LEFT_TORCH.value:
-                        torch_sin = math.sin((tile[0][1] % 100 + 200) / 300 * self.data.total_time * 0.08)
-                        #torch_sin = math.sin(1 * self.data.total_time * 0.06)
-                        blit_center_add(
-                                self.base_display, 
-                                circle_surf(24 + (torch_sin + 3) * 8.5, 
-                                            (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 4 + (torch_sin + 4) * 0.1)
-                                            ), 
-                                (real_pos[0] - self.data.offset[0] + 10, real_pos[1] - self.data.offset[1] + 4)
-                            )
-                        blit_center_add(
-                                self.base_display,
-                                circle_surf(10 + (torch_sin + 3) * 8.5, 
-                                            (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 6 + (torch_sin + 4) * 0.2)
-                                            ),
-                                (real_pos[0] - self.data.offset[0] + 10, real_pos[1] - self.data.offset[1] + 4)
-                            )
-                        if random.randint(1, 6) == 1 and self.data.game_on():
-                            self.data.particles.append(
-                                    Particle(
-                                            real_pos[0] + random.randrange(-1, 1) + 12,                         # x
-                                            real_pos[1] + random.randrange(-1, 1) + 4,                          # y 
-                                            'light',                                                            # type
-                                            [random.uniform(-.14, .12), random.uniform(-.7, -.4)],              # motion
-                                            0.02,                                                               # decay 
-                                            3 + random.randint(0, 20) / 10,                                     # start_frame
-                                            custom_color=(255, 255, 255)                                        # color
-                                        )
-                                )
-
-                    elif tile[3] == Decor.RIGHT_TORCH.value:
-                        torch_sin = math.sin((tile[0][1] % 100 + 200) / 300 * self.data.total_time * 0.08)
-
-                        blit_center_add( self.base_display, circle_surf(24 + (torch_sin + 3) * 8.5,  (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 4 + (torch_sin + 4) * 0.1)), (real_pos[0] - self.data.offset[0] + 10, real_pos[1] - self.data.offset[1] + 4))
-                        blit_center_add( self.base_display, circle_surf(10 + (torch_sin + 3) * 8.5, (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 6 + (torch_sin + 4) * 0.2)),(real_pos[0] - self.data.offset[0] + 10, real_pos[1] - self.data.offset[1] + 4))
-                        if random.randint(1, 6) == 1 and self.data.game_on():
-                            self.data.particles.append(
-                                    Particle(
-                                            real_pos[0] + random.randrange(-1, 1) + 4,                         # x
-                                            real_pos[1] + random.randrange(-1, 1) + 2,                          # y 
-                                            'light',                                                            # type
-                                            [random.uniform(-.14, .12), random.uniform(-.6, -.4)],                # motion
-                                            0.02,                                                               # decay 
-                                            3 + random.randint(0, 20) / 10,                                     # start_frame
-                                            custom_color=(255, 255, 255)                                        # color
-                                        )
-                                )
-                    elif tile[3] == Decor.BIG_TORCH.value:
-                        torch_sin = math.sin((tile[0][1] % 100 + 200) / 300 * self.data.total_time * 0.08)
-                        blit_center_add( self.base_display, circle_surf(24 + (torch_sin + 3) * 8.5,  (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 4 + (torch_sin + 4) * 0.1)), 
-                                         ((real_pos[0] - self.data.offset[0]) + 11,  (real_pos[1] - self.data.offset[1]) + 7))
-                        blit_center_add( self.base_display, circle_surf(10 + (torch_sin + 3) * 8.5, (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 6 + (torch_sin + 4) * 0.2)),
-                                         ((real_pos[0] - self.data.offset[0]) + 13,  (real_pos[1] - self.data.offset[1]) + 10))
-
-                        rand_num = random.randint(1, 8)
-                        if rand_num == 1 and self.data.game_on():
-                            self.data.particles.append( Particle( real_pos[0] + random.randrange(-1, 1) + 3, real_pos[1] + random.randrange(-1, 1) + 7, 'light', [random.uniform(-.14, .12), random.uniform(-.6, -.4)], 0.02, 3 + random.randint(0, 20) / 10, custom_color=(255, 255, 255)) )
-                        if rand_num == 2 and self.data.game_on():
-                            self.data.particles.append( Particle( real_pos[0] + random.randrange(-1, 1) + 22, real_pos[1] + random.randrange(-1, 1) + 7, 'light', [random.uniform(-.14, .12), random.uniform(-.6, -.4)], 0.02, 3 + random.randint(0, 20) / 10, custom_color=(255, 255, 255)) )
-
-                        #if rand_num == 2 and self.data.game_on():
-                            #self.data.particles.append( Particle( real_pos[0] + random.randrange(-1, 1) + 7, real_pos[1] + random.randrange(-1, 1) + 10, 'light', [random.uniform(-.14, .12), random.uniform(-.6, -.4)], 0.02, 3 + random.randint(0, 20) / 10, custom_color=(255, 255, 255)) )
-                        #if rand_num == 4 and self.data.game_on():
-                        #    self.data.particles.append( Particle( real_pos[0] + random.randrange(-1, 1) + 17, real_pos[1] + random.randrange(-1, 1) + 10, 'light', [random.uniform(-.14, .12), random.uniform(-.6, -.4)], 0.02, 3 + random.randint(0, 20) / 10, custom_color=(255, 255, 255)) )
+        self.data.tile_map.render(self.base_display, self.data.offset)
 
-                    else:
-                        print('here')
+        self.render_lights()
+        self.light_map.render(self.base_display)
 
         if self.data.game_on():
             self.data.player.update(1/60)
@@ -285,27 +241,13 @@ class App:
         # ------------------- RENDER PARTICLES -------------------- #
 
         # ---- PARTICLES
-        for particle in self.data.particles.copy():
-            alive = particle.update(0.3 * self.dt) if self.data.game_on() else True
-
-            if particle.type == 'light':
-                particle.draw(self.base_display, self.data.offset)
-                blit_center_add(
-                                self.base_display, 
-                                    circle_surf(
-                                            10, 
-                                            (28, 6, 6)),
-                                (particle.x - self.data.offset[0], particle.y - self.data.offset[1]))
-            if particle.type == 'p':
-                particle.draw(self.base_display, self.data.offset)
-                blit_center_add(
-                                self.base_display, 
-                                    circle_surf(
-                                            10, 
-                                            (28, 26, 6)),
-                                (particle.x - self.data.offset[0], particle.y - self.data.offset[1]))    
-            if not alive:
-                self.data.particles.remove(particle)
+        particles = self.data.particles
+        if self.data.game_on():
+            particles.update()
+        self.base_display.blits(particles.draw_list(('light', 'p'), self.data.offset), False)
+        self.light_map.add_many(particles.light_positions('light', self.data.offset), 10, (28, 6, 6))
+        self.light_map.add_many(particles.light_positions('p', self.data.offset), 10, (28, 26, 6))
+        particles.compact()
 
         # ------ ENEMY_PROJECTILES 
 
@@ -317,18 +259,13 @@ class App:
             img_rect = image.get_rect(center=(proj[0][0] - self.data.offset[0], proj[0][1] - self.data.offset[1]))
             self.base_display.blit(image, img_rect)
             proj_sin = math.sin((proj[3] % 100 + 100) / 200 * self.data.total_time * 0.4)
-            blit_center_add(
-                self.base_display,
-                circle_surf(
-                    10 + (proj_sin + 3) * 2,
-                    (28, 6, 6)),
-                (proj[0][0] - self.data.offset[0], proj[0][1] - self.data.offset[1]))
+            self.light_map.add((proj[0][0] - self.data.offset[0], proj[0][1] - self.data.offset[1]), 10 + (proj_sin + 3) * 2, (28, 6, 6))
 
             dist_from_player = distance(proj[0], self.data.player.pos)
             if dist_from_player > 300:
                 self.data.enemy_projectiles.pop(i)
             
-            if mask_collision(self.data.player.mask, self.data.player.pos, pg.mask.from_surface(image), proj[0]) \
+            if mask_collision(self.data.player.mask, self.data.player.pos, projectile_masks['e_projectile'][proj[2]], proj[0]) \
                 and self.data.player.force_scalar == 1 and (self.data.e_handler.state == State.GAME_ON or self.data.e_handler.state == State.TUTORIAL) \
                 and self.data.player.state != 'hurt':
                 self.data.screenshake = 8
@@ -337,82 +274,75 @@ class App:
 
         # ------ CIRCLES 
 
-        # [pos, speed, radius, width, decay, speed_decay, color ] 
-        for circle in self.data.circles.copy():
-            pg.draw.circle(self.base_display, circle[6], 
-                           (circle[0][0] - self.data.offset[0], circle[0][1] - self.data.offset[1]), int(circle[2]), int(circle[3]))
-            circle[2] += circle[1]
-            circle[3] *= circle[4]
-            circle[2] -= circle[5]
-            if circle[3] < 1:
-                self.data.circles.remove(circle)
+        circles = self.data.circles
+        dead = []
+        for i in range(circles.count):
+            circle = circles.items[i]
+            pg.draw.circle(self.base_display, circle.color, 
+                           (circle.x - self.data.offset[0], circle.y - self.data.offset[1]), int(circle.radius), int(circle.width))
+            circle.radius += circle.speed
+            circle.width *= circle.decay
+            circle.radius -= circle.speed_decay
+            if circle.width < 1:
+                dead.append(i)
+        circles.free(dead)
 
         if self.left_clicked:
             self.test_func()
 
         # ------ SPARKS 
 
-        # [ pos, angle, speed, width, decay, speed_decay, length, length_decay, color ]
-        for spark in self.data.sparks.copy():
-            spark[0][0] += math.cos(spark[1]) * spark[2]
-            spark[0][1] += math.sin(spark[1]) * spark[2]
-            spark[3] -= spark[4] # sub width by decay 
-            spark[2] *= spark[5] # decrase speed by speed decay 
-            spark[6] *= spark[7] # decrease lenght by mult of lngth decay 
-
-            if spark[3] <= 0:
-                self.data.sparks.remove(spark)
-                continue
-            points = [
-                (spark[0][0] + math.cos(spark[1]) * spark[6], spark[0][1] + math.sin(spark[1]) * spark[6]),
-                (spark[0][0] + math.cos(spark[1] + math.pi / 2) * spark[3], spark[0][1] + math.sin(spark[1] + math.pi / 2) * spark[3]),
-                (spark[0][0] - math.cos(spark[1]) * spark[6], spark[0][1] - math.sin(spark[1]) * spark[6]),
-                (spark[0][0] + math.cos(spark[1] - math.pi / 2) * spark[3], spark[0][1] + math.sin(spark[1] - math.pi / 2) * spark[3]),
-            ]
-            points = [(p[0] - self.data.offset[0], p[1] - self.data.offset[1]) for p in points]
+        sparks = self.data.sparks
+        sparks.update()
+        for points in sparks.polygons(self.data.offset):
             pg.draw.polygon(self.base_display, (247, 237, 186), points)
 
+        # ------ CIRCLE PARTICLES
 
-        # [ type, pos, vel, color, size, decay, dur ]
-        for p in self.data.circle_particles.copy():
+        pool = self.data.circle_particles
+        bouncing = [p for p in pool.live() if p.type == 'blood' or p.type == 'fire_ball']
+        if bouncing:
+            hit_x, hit_y = self.data.tile_map.tile_collide_batch([(p.x, p.y) for p in bouncing], [(p.vx, p.vy) for p in bouncing])
+            for p, hx, hy in zip(bouncing, hit_x.tolist(), hit_y.tolist()):
+                if hx: p.vx *= -0.7
+                else: p.x += p.vx
+                if hy: p.vy *= -0.7
+                else: p.y += p.vy
+                p.vy += .15  # gravity
 
-            if p[0] == 'blood' or p[0] == 'fire_ball':
-                p[1][0] += p[2][0]
-                if self.data.tile_map.tile_collide(p[1]):
-                    p[1][0] -= p[2][0]
-                    p[2][0] *= -0.7
-                p[1][1] += p[2][1]
-                if self.data.tile_map.tile_collide((p[1][0], p[1][1])):
-                    p[1][1] -= p[2][1]
-                    p[2][1] *= -0.7
-                p[2][1] += .15  # gravity
+        dead = []
+        for i in range(pool.count):
+            p = pool.items[i]
 
-            if p[0] == 'fire':
-                p[1][0] += p[2][0]
-                p[1][1] += p[2][1]
+            if p.type == 'fire':
+                p.x += p.vx
+                p.y += p.vy
 
-                if p[6] < 0.2: 
-                    p[4] += p[5]
+                if p.dur < 0.2: 
+                    p.size += p.decay
 
-                if p[6] < 0.4: p[3] = (0, 128, 255)
-                elif p[6] < 0.6: p[3] = (50, 150, 250)
-                elif p[6] < 0.9: p[3] = (40, 240, 250)
-                elif p[6] < 0.14: p[3] = (160, 246, 255)
-                else: p[3] = (210, 250, 255)
+                if p.dur < 0.4: p.color = (0, 128, 255)
+                elif p.dur < 0.6: p.color = (50, 150, 250)
+                elif p.dur < 0.9: p.color = (40, 240, 250)
+                elif p.dur < 0.14: p.color = (160, 246, 255)
+                else: p.color = (210, 250, 255)
 
-                p[6] += p[5]
+                p.dur += p.decay
 
-            if p[0] == 'fire_ball':
-                particle = ['fire', p[1].copy(), [random.random() - .5, random.randrange(-4, -1)],
-                            (10, 0, 0), random.randrange(3, 4), random.uniform(.12, .18), 0]
-                self.data.circle_particles.append(particle)
+            if p.type == 'fire_ball':
+                pool.add('fire', (p.x, p.y), (random.random() - .5, random.randrange(-4, -1)),
+                         (10, 0, 0), random.randrange(3, 4), random.uniform(.12, .18), 0)
 
-            p[4] -= p[5]
+            p.size -= p.decay
 
-            if p[4] < 1:
-                self.data.circle_particles.remove(p)
+            if p.size < 1:
+                dead.append(i)
             else:
-                pg.draw.circle(self.base_display, p[3], (p[1][0] - self.data.offset[0], p[1][1] - self.data.offset[1]), p[4])
+                pg.draw.circle(self.base_display, p.color, (p.x - self.data.offset[0], p.y - self.data.offset[1]), p.size)
+        pool.free(dead)
+
+        # ------ LIGHTS (particles and projectiles, torches went in under the player)
+        self.light_map.render(self.base_display)
 
         # ---------------------- LEVEL MECHANICS -------------------- #
 
@@ -484,26 +414,27 @@ class App:
             if self.data.transition[3] == 'closing':
                 if self.data.transition[1] < self.data.transition[0]:
                     self.data.transition[1] += self.data.transition[2]
-                    if self.data.transition[1] >= self.data.transition[0]:
-                        self.data.e_handler.level += 1
-                        if self.data.e_handler.level == MAX_ROUNDS: 
-                            self.data.e_handler.change_state(State.WIN) 
-                            return
-                        self.data.reset()
-
-                        self.data.offset[0] = ( ( self.data.player.pos[0] - WIDTH // 2 )  - self.data.offset[0]) / 12
-                        self.data.offset[1] = ( ( self.data.player.pos[1] - HEIGHT // 2 )  - self.data.offset[1]) / 12
-                        if self.data.offset[0] < self.data.edges[0]:
-                            self.data.offset[0] = self.data.edges[0]
-                        if self.data.offset[0] + WIDTH > self.data.edges[1]:
-                            self.data.offset[0] = self.data.edges[1] - WIDTH
-                            
-                        if self.data.offset[1] < self.data.edges[2]:
-                            self.data.offset[1] = self.data.edges[2]
-                        if self.data.offset[1] + HEIGHT > self.data.edges[3]:
-                            self.data.offset[1] = self.data.edges[3] - HEIGHT
-
-                        self.data.transition[3] = 'opening'
+                # the circle stays closed while the next map is still being read
+                if self.data.transition[1] >= self.data.transition[0] and self.data.next_map_ready():
+                    self.data.e_handler.level += 1
+                    if self.data.e_handler.level == MAX_ROUNDS: 
+                        self.data.e_handler.change_state(State.WIN) 
+                        return
+                    self.data.reset()
+
+                    self.data.offset[0] = ( ( self.data.player.pos[0] - WIDTH // 2 )  - self.data.offset[0]) / 12
+                    self.data.offset[1] = ( ( self.data.player.pos[1] - HEIGHT // 2 )  - self.data.offset[1]) / 12
+                    if self.data.offset[0] < self.data.edges[0]:
+                        self.data.offset[0] = self.data.edges[0]
+                    if self.data.offset[0] + WIDTH > self.data.edges[1]:
+                        self.data.offset[0] = self.data.edges[1] - WIDTH
+                        
+                    if self.data.offset[1] < self.data.edges[2]:
+                        self.data.offset[1] = self.data.edges[2]
+                    if self.data.offset[1] + HEIGHT > self.data.edges[3]:
+                        self.data.offset[1] = self.data.edges[3] - HEIGHT
+
+                    self.data.transition[3] = 'opening'
             else:
                 self.data.transition[1] -= self.data.transition[2]
                 if self.data.transition[1] < 0:
@@ -561,6 +492,28 @@ class App:
         pg.display.flip()
         pg.display.update()
 
+    def render_lights(self):
+        for emitter in self.data.tile_map.get_visible_emitters(self.data.offset):
+            torch_sin = math.sin(emitter.flicker * self.data.total_time)
+            x = emitter.pos[0] - self.data.offset[0]
+            y = emitter.pos[1] - self.data.offset[1]
+            outer, inner = emitter.glows
+            self.light_map.add((x + outer[0], y + outer[1]), 24 + (torch_sin + 3) * 8.5, (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 4 + (torch_sin + 4) * 0.1))
+            self.light_map.add((x + inner[0], y + inner[1]), 10 + (torch_sin + 3) * 8.5, (28 + (torch_sin + 4) * 0.1, 6 + (torch_sin + 4) * 0.2, 6 + (torch_sin + 4) * 0.2))
+
+            roll = random.randint(1, emitter.spawn_chance)
+            if roll <= len(emitter.spawns) and self.data.game_on():
+                spawn = emitter.spawns[roll - 1]
+                self.data.particles.add(
+                        emitter.pos[0] + random.randrange(-1, 1) + spawn[0],           # x
+                        emitter.pos[1] + random.randrange(-1, 1) + spawn[1],           # y
+                        'light',                                                        # type
+                        [random.uniform(-.14, .12), random.uniform(*emitter.rise)],     # motion
+                        0.02,                                                           # decay
+                        3 + random.randint(0, 20) / 10,                                 # start_frame
+                        custom_color=(255, 255, 255)                                    # color
+                    )
+
     def rand_proj(self, case):
         if case == 'top':
             pos = [random.randrange(-10, WIDTH) + self.data.offset[0], self.data.offset[1]-8]
@@ -597,17 +550,16 @@ class App:
         for j in range(3):
             # [ pos, angle, speed, width, decay, speed_decay, length, length_decay, color ]
             offset = rand_rad_angle(6)
-            spark = [[rand_pos[0], rand_pos[1]],
-                     ang + offset,
-                     random.randrange(8, 11),
-                     random.randrange(6, 8),
-                     0.44,
-                     0.92,
-                     random.randrange(19, 22),
-                     0.96,
-                     (20, 6, 6)
-                     ]
-            self.data.sparks.append(spark)
+            self.data.sparks.add(rand_pos,
+                                 ang + offset,
+                                 random.randrange(8, 11),
+                                 random.randrange(6, 8),
+                                 0.44,
+                                 0.92,
+                                 random.randrange(19, 22),
+                                 0.96,
+                                 (20, 6, 6)
+                                 )
 
     def game_mechanics(self):
         if self.data.e_handler.level_run:
@@ -656,34 +608,30 @@ class App:
                 [[WIDTH + self.data.offset[0], (i * 22) + self.data.offset[1]], [-1.8, 0], 0, random.randrange(1, 6)])
             for j in range(3):
                 ang = math.pi + random.uniform(-math.pi/8, math.pi/8)
-                spark = [[WIDTH + self.data.offset[0], (i * 22) + self.data.offset[1]], ang, random.randrange(
-                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6)]
-                self.data.sparks.append(spark) 
+                self.data.sparks.add([WIDTH + self.data.offset[0], (i * 22) + self.data.offset[1]], ang, random.randrange(
+                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6))
     def left_line(self):
         for i in range(14):
             self.data.enemy_projectiles.append([[self.data.offset[0], (i * 22) + self.data.offset[1]], [1.8, 0], 0, random.randrange(1, 6)])
             for j in range(3):
                 ang = 0 + random.uniform(-math.pi/8, math.pi/8)
-                spark = [[self.data.offset[0], (i * 22) + self.data.offset[1]], ang, random.randrange(
-                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6)]
-                self.data.sparks.append(spark)
+                self.data.sparks.add([self.data.offset[0], (i * 22) + self.data.offset[1]], ang, random.randrange(
+                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6))
     def top_line(self):
         for i in range(14):
             self.data.enemy_projectiles.append([[40+self.data.offset[0] +  (i * 22), self.data.offset[1]+10], [0, 1.8], 0, random.randrange(1, 6)])
             for j in range(3):
                 ang = math.pi/2 + random.uniform(-math.pi/8, math.pi/8)
-                spark = [[40+self.data.offset[0] + (i * 22) , self.data.offset[1]], ang, random.randrange(
-                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6)]
-                self.data.sparks.append(spark)
+                self.data.sparks.add([40+self.data.offset[0] + (i * 22) , self.data.offset[1]], ang, random.randrange(
+                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6))
 
     def bottom_line(self):
         for i in range(14):
             self.data.enemy_projectiles.append([[40+self.data.offset[0] +  (i * 22), self.data.offset[1]+WIDTH-10], [0, -1.8], 0, random.randrange(1, 6)])
             for j in range(3):
                 ang = (3*math.pi/2) + random.uniform(-math.pi/8, math.pi/8)
-                spark = [[40+self.data.offset[0] + (i * 22) , self.data.offset[1]+WIDTH], ang, random.randrange(
-                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6)]
-                self.data.sparks.append(spark)
+                self.data.sparks.add([40+self.data.offset[0] + (i * 22) , self.data.offset[1]+WIDTH], ang, random.randrange(
+                    8, 11), random.randrange(2, 4), 0.12, 0.9, random.randrange(10, 12), 0.97, (20, 6, 6))
 
     def update(self):
         self.clock.tick(FPS)
@@ -694,11 +642,13 @@ class App:
     def check_inputs(self):
         for e in pg.event.get():
             if e.type == pg.QUIT:
+                pixel_cache.save()
                 pg.quit()
                 sys.exit()
 
             if e.type == pg.KEYDOWN:
                 if e.key == pg.K_1:
+                    pixel_cache.save()
                     pg.quit()
                     sys.exit()
                 if e.key == pg.K_a: